@@ -1,20 +1,41 @@
 import unittest
 import jinja2
 import datetime
+import json
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NOW = datetime.datetime(2025, 9, 18, 12, 0, 0)
+TYPES = ['st1', 'st2', 'st3', 'st4', 'st5', 'st6']
+
+
+def hourly_series(days, peak=8.0):
+    """Open-Meteo style hourly arrays starting at midnight of NOW's day, UV peaking at 13:00."""
+    start = NOW.replace(hour=0)
+    times, uvs = [], []
+    for h in range(24 * days):
+        t = start + datetime.timedelta(hours=h)
+        times.append(t.isoformat())
+        uvs.append(round(max(0.0, peak * (1 - abs(t.hour - 13) / 7.0)), 2))
+    return {'time': times, 'uv_index': uvs}
+
 
 class TestUvSafeExposureMulti(unittest.TestCase):
     def setUp(self):
         # Load the Jinja template
-        with open('exposure_st.jinja') as f:
+        with open(os.path.join(HERE, 'exposure_st.jinja')) as f:
             self.template_source = f.read()
-        self.env = jinja2.Environment()
+        # Home Assistant enables loopcontrols and provides these as filters
+        self.env = jinja2.Environment(extensions=['jinja2.ext.loopcontrols'])
         self.env.globals.update({
-            'now': lambda: datetime.datetime(2025, 9, 18, 12, 0, 0),
+            'now': lambda: NOW,
             'state_attr': self.mock_state_attr,
             'is_state': lambda eid, val: True,
+        })
+        self.env.filters.update({
             'as_datetime': self.mock_as_datetime,
             'as_local': lambda dt: dt,
-            'tojson': lambda obj: obj,
+            'tojson': json.dumps,
         })
         self.template = self.env.from_string(self.template_source)
 
@@ -37,23 +58,50 @@ class TestUvSafeExposureMulti(unittest.TestCase):
         except Exception:
             return default
 
+    def render(self, hourly=None):
+        if hourly is not None:
+            self.env.globals['state_attr'] = lambda eid, attr: hourly if attr == 'hourly' else None
+            self.template = self.env.from_string(self.template_source)
+        return json.loads(str(self.template.module.uv_safe_exposure_multi('weather.test')))
+
     def test_uv_safe_exposure_multi(self):
         # Call the macro with a mock entity_id
-        result = self.template.module.uv_safe_exposure_multi('weather.test')
+        result = self.render()
         self.assertIsInstance(result, dict)
-        for k in ['st1','st2','st3','st4','st5','st6']:
+        for k in TYPES:
             self.assertIn(k, result)
             self.assertIn('mins', result[k])
             self.assertIn('capped', result[k])
 
     def test_no_uv(self):
         # Patch mock_state_attr to return no UV
-        self.env.globals['state_attr'] = lambda eid, attr: {'time': ['2025-09-18T12:00:00'], 'uv_index': [0.0]}
-        template = self.env.from_string(self.template_source)
-        result = template.module.uv_safe_exposure_multi('weather.test')
-        for k in ['st1','st2','st3','st4','st5','st6']:
+        result = self.render({'time': ['2025-09-18T12:00:00'], 'uv_index': [0.0]})
+        for k in TYPES:
             self.assertEqual(result[k]['mins'], 0)
             self.assertFalse(result[k]['capped'])
 
+    def test_budgets_reached_in_order(self):
+        # 150 UV-min to 13:00, then 90 more to 14:00: st1 and st2 run out in the second hour,
+        # the rest are capped at the last positive sample (13:00)
+        result = self.render()
+        self.assertEqual(result['st1']['mins'], 71)
+        self.assertFalse(result['st1']['capped'])
+        self.assertEqual(result['st2']['mins'], 93)
+        self.assertFalse(result['st2']['capped'])
+        for k in ['st3', 'st4', 'st5', 'st6']:
+            self.assertEqual(result[k]['mins'], 60)
+            self.assertTrue(result[k]['capped'])
+
+    def test_end_times_ascend_with_skin_type(self):
+        result = self.render(hourly_series(1))
+        ends = [result[k]['end_ts'] for k in TYPES]
+        self.assertEqual(ends, sorted(ends))
+        self.assertFalse(any(result[k]['capped'] for k in TYPES))
+
+    def test_seven_day_series_matches_first_day(self):
+        # Later days never count; the pass stops at the end of the first day
+        self.assertEqual(self.render(hourly_series(7)), self.render(hourly_series(1)))
+
+
 if __name__ == '__main__':
     unittest.main()
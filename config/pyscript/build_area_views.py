@@ -1,29 +1,55 @@
 # Pyscript: build_area_views.py
 # Creates static YAML card lists per "view" from areas, using HA registries.
-# Files written to: /config/dashboards/_generated/<view_key>.yaml
+# Files written to: /config/dashboards/{spaces,systems}/views/<view_key>.yaml, with each area
+# (or system group) block's cards in ../fragments/<view_key>/<name>.yaml, pulled in via !include.
+# Shared card skeletons (stack wrapper, trend charts) are templates in dashboards/decluttering.yaml.
+# Area chips read their text, icon and color from one generated presentation sensor per entity
+# (packages/ui/spaces_chips.yaml), so the device-class pipeline runs once per state change.
 #
 # Call manually:  pyscript.build_area_views()   or   pyscript.build_area_views(view="downstairs")
-# Auto-rebuilds on startup and when registries change.
+# Auto-rebuilds on startup, and on registry updates rewrites only the views whose inputs changed.
+# Each build publishes its duration, per-phase timings and output sizes on sensor.dashboard_views_build.
 
+import asyncio
 import builtins
+import hashlib
+import json
 import logging
 import os
-from pathlib import Path
-from typing import Dict, List
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
 
 import yaml
 from homeassistant.helpers import area_registry, device_registry, entity_registry, floor_registry
 
-# Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,  # Set the logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",  # Customize log message format
-)
-logger = logging.getLogger(__name__)  # This gets the logger for your script
+logger = logging.getLogger(__name__)
 
 OUT_DIR = "/config/dashboards/spaces/views"
 SYSTEMS_OUT_DIR = "/config/dashboards/systems/views"
 
+# Per-area (and per system group) card blocks, pulled into the view files with !include.
+# Kept outside the views/ folders, which the dashboards load with !include_dir_list.
+FRAGMENTS_DIR = "/config/dashboards/spaces/fragments"
+SYSTEMS_FRAGMENTS_DIR = "/config/dashboards/systems/fragments"
+
+# Package holding the chip presentation sensors (sensor.ui_chip_<entity>), loaded via packages/
+CHIP_PACKAGE_DIR = "/config/packages/ui"
+CHIP_PACKAGE_NAME = "spaces_chips.yaml"
+
+# Fields each chip presentation sensor carries as attributes
+CHIP_FIELDS = ["name", "short_desc", "icon", "color"]
+
+# Views generated concurrently within one build
+BUILD_CONCURRENCY = 4
+
+# Sensor carrying the last build's duration, per-phase timings and output sizes
+METRICS_SENSOR = "sensor.dashboard_views_build"
+
+# Rebuild requests are coalesced until no new request has arrived for this many seconds
+REBUILD_QUIET_SECS = 5.0
+
 VIEW_DEFS: Dict[str, Dict] = {
     "01_downstairs": {
         "title": "Downstairs",
@@ -202,77 +228,103 @@ APP_DEFAULT: Dict[str, str] = {"daily_total": "energy_daily_house", "daily": "en
 
 # --------------------------------------------------------------------
 
-# ----- helpers --------------------------------------------------------
+# Input fingerprint each generated view was last written from, keyed by view key.
+# Registry-driven rebuilds skip views whose fingerprint is unchanged.
+_VIEW_FINGERPRINTS: Dict[str, Dict[str, str]] = {"area": {}, "system": {}}
+
+# Chips each area view was last written with, keyed by view key: [(entity_id, app), ...].
+# The chip package is the union over all area views, including the ones a build skipped.
+_CHIP_ENTITIES: Dict[str, List[Tuple[str, str]]] = {}
+
+# Rebuild scheduler state. Requests merge into a single pending request (None = idle),
+# which becomes ready once REBUILD_QUIET_SECS pass without a new one. At most one build
+# runs at a time; a request arriving mid-build waits as the single queued follow-up.
+_SCHED: Dict = {
+    "pending": None,  # {"area": set | None, "system": set | None, "force": bool}; None key set = all views
+    "ready": False,
+    "running": False,
+    "stats": {"requested": 0, "merged": 0, "runs": 0, "rebuilt": 0, "skipped": 0},
+}
 
+# ----- helpers --------------------------------------------------------
 
-async def _find_area_by_name(ar, area_name: str):
-    areas = ar.async_list_areas()
-    for a in areas:
-        if a.id == area_name:
-            return a
-    return None
 
+async def _registry_snapshot() -> Dict:
+    """Index the area/device/entity/floor registries in one pass, shared by every builder in a build.
 
-async def _entities_in_area(area_name: str) -> List[str]:
-    """Collect entity_ids that belong to an area (by area_id on entity or via device.area_id)."""
+    Returns a dict with:
+      areas:            {area_id: AreaEntry}
+      entities_by_area: {area_id: [entity_id, ...]}  (enabled only, registry order)
+      floors:           {floor_id: floor_name}
+      records:          {entity_id: record}  (filled lazily by _records_for)
+      chips:            {area_id: [(entity_id, app), ...]}  (filled by _cards_for_area)
+    """
     ar = await area_registry.async_get(hass)
     dr = await device_registry.async_get(hass)
     er = await entity_registry.async_get(hass)
+    fr = await floor_registry.async_get(hass)
 
-    area = await _find_area_by_name(ar, area_name)
-    if not area:
-        return []
+    areas = {a.id: a for a in ar.async_list_areas()}
+
+    floors: Dict[str, str] = {}
+    for f in fr.async_list_floors():
+        fid = getattr(f, "floor_id", None) or getattr(f, "id", None)
+        if not fid:
+            continue
+        floors[fid] = getattr(f, "name", fid) or fid
 
-    device_ids = {d.id for d in dr.devices.values() if d.area_id == area.id}
-    ents = []
+    device_area: Dict[str, str] = {d.id: d.area_id for d in dr.devices.values() if d.area_id}
+
+    # An entity belongs to its own area and, if different, to its device's area.
+    entities_by_area: Dict[str, List[str]] = {}
     for ent in er.entities.values():
-        if (ent.area_id == area.id or (ent.device_id and ent.device_id in device_ids)) and ent.disabled_by is None:
-            ents.append(ent.entity_id)
-    return ents
+        if ent.disabled_by is not None:
+            continue
+        dev_area = device_area.get(ent.device_id) if ent.device_id else None
+        if ent.area_id:
+            entities_by_area.setdefault(ent.area_id, []).append(ent.entity_id)
+        if dev_area and dev_area != ent.area_id:
+            entities_by_area.setdefault(dev_area, []).append(ent.entity_id)
 
+    return {
+        "areas": areas,
+        "entities_by_area": entities_by_area,
+        "floors": floors,
+        "records": {},
+        "chips": {},
+    }
 
-def _dom(eid: str) -> str:
-    return eid.split(".", 1)[0]
 
+def _find_area_by_name(snap: Dict, area_name: str):
+    return snap["areas"].get(area_name)
 
-def _fname(eid: str) -> str:
-    st = hass.states.get(eid)
-    return (st and st.attributes.get("friendly_name")) or eid
 
+def _entities_in_area(area_name: str, snap: Dict) -> List[str]:
+    """Entity_ids that belong to an area (by area_id on entity or via device.area_id)."""
+    if _find_area_by_name(snap, area_name) is None:
+        return []
+    return list(snap["entities_by_area"].get(area_name, []))
 
-def _device_class(eid: str) -> str:
-    st = hass.states.get(eid)
-    return (st and st.attributes.get("device_class")) or ""
 
+def _dom(eid: str) -> str:
+    return eid.split(".", 1)[0]
 
-def _is_utility_meter_sensor(eid: str) -> bool:
+
+def _is_utility_meter_sensor(rec: Dict) -> bool:
     """Heuristic: utility_meter sensors commonly expose last_period and/or meter_period attributes."""
-    if _dom(eid) != "sensor":
-        return False
-    st = hass.states.get(eid)
-    if not st:
-        return False
-    attrs = st.attributes or {}
-    return ("last_period" in attrs) or ("meter_period" in attrs)
+    return rec["domain"] == "sensor" and rec["utility_meter"]
 
 
-def _is_outlet_switch(eid: str) -> bool:
+def _is_outlet_switch(rec: Dict) -> bool:
     # Prefer device_class when present, fall back to name heuristics.
-    if _dom(eid) != "switch":
+    if rec["domain"] != "switch":
         return False
-    dc = _device_class(eid)
-    if dc == "outlet":
+    if rec["device_class"] == "outlet":
         return True
-    n = _fname(eid).lower()
+    n = rec["friendly_name"].lower()
     return ("outlet" in n) or ("plug" in n)
 
 
-def _sorted(eids: List[str]) -> List[str]:
-    pairs = [(_fname(e).lower(), e) for e in eids]
-    pairs.sort(key=lambda p: p[0])
-    return [e for _, e in pairs]
-
-
 def _dedupe_preserve_order(items: List[str]) -> List[str]:
     seen = set()
     return [i for i in items if not (i in seen or seen.add(i))]
@@ -282,6 +334,21 @@ def _grid(cards: List[dict], cols: int = 2) -> dict:
     return {"type": "grid", "columns": cols, "square": False, "cards": cards}
 
 
+# Card skeletons repeated across views (the stack-in-card wrapper, the apexcharts
+# axes and formatters) are decluttering templates in dashboards/decluttering.yaml;
+# generated views reference them by name and pass only the per-card parts.
+
+
+def _stack_card(cards) -> dict:
+    """Rounded vertical stack-in-card around cards (decluttering template `stack_in_card`)."""
+    return {"type": "custom:decluttering-card", "template": "stack_in_card", "variables": [{"cards": cards}]}
+
+
+def _trend_chart(template: str, series: List[dict]) -> dict:
+    """apexcharts-card from a shared chart template, with this area's series."""
+    return {"type": "custom:decluttering-card", "template": template, "variables": [{"series": series}]}
+
+
 def _title(subtitle: str, title: str = "") -> dict:
     if title and not subtitle:
         return {"type": "heading", "heading": title, "heading_style": "title"}
@@ -304,13 +371,12 @@ def _preferred_area_order() -> List[str]:
     return preferred
 
 
-async def _all_areas_in_order() -> List[str]:
-    ar = await area_registry.async_get(hass)
+def _all_areas_in_order(snap: Dict) -> List[str]:
     preferred = _preferred_area_order()
     preferred_set = set(preferred)
 
     # Add any areas not already in VIEW_DEFS, sorted by display name
-    others = [a.id for a in ar.async_list_areas() if a.id not in preferred_set]
+    others = [aid for aid in snap["areas"] if aid not in preferred_set]
     others.sort(key=lambda aid: (_area_friendly_name(aid) or aid).lower())
 
     return preferred + others
@@ -322,28 +388,15 @@ def _area_friendly_name(area_id: str) -> str:
     return area_id
 
 
-async def _floor_lookup() -> Dict[str, str]:
-    """Return {floor_id: floor_name}. Handles either id or floor_id attributes."""
-    fr = await floor_registry.async_get(hass)
-    lookup: Dict[str, str] = {}
-    for f in fr.async_list_floors():
-        fid = getattr(f, "floor_id", None) or getattr(f, "id", None)
-        if not fid:
-            continue
-        lookup[fid] = getattr(f, "name", fid) or fid
-    return lookup
-
-
-async def _areas_grouped_by_floor(area_ids: List[str]) -> List[Dict]:
+def _areas_grouped_by_floor(area_ids: List[str], snap: Dict) -> List[Dict]:
     """Group areas by floor while preserving the order provided by area_ids."""
-    ar = await area_registry.async_get(hass)
-    floor_names = await _floor_lookup()
+    floor_names = snap["floors"]
 
     ordering: List[str] = []
     grouped: Dict[str, Dict] = {}
 
     for aid in area_ids:
-        area = await _find_area_by_name(ar, aid)
+        area = _find_area_by_name(snap, aid)
         floor_id = getattr(area, "floor_id", None) if area else None
         key = floor_id or "__unassigned__"
 
@@ -360,11 +413,98 @@ async def _areas_grouped_by_floor(area_ids: List[str]) -> List[Dict]:
     return [grouped[k] for k in ordering]
 
 
+# ----- entity classification ------------------------------------------
+
+# Domains that map straight to one _cards_for_area bucket
+_DOMAIN_BUCKETS: Dict[str, str] = {
+    "binary_sensor": "binary",
+    "climate": "climates",
+    "humidifier": "humidifiers",
+    "switch": "switches",
+    "light": "lights",
+    "fan": "fans",
+    "cover": "covers",
+    "lock": "locks",
+    "media_player": "media",
+    "automation": "automations",
+}
+
+# Sensor device classes that map to a bucket regardless of meter
+_SENSOR_BUCKETS: Dict[str, str] = {
+    "temperature": "temp",
+    "humidity": "hum",
+    "volume_flow_rate": "gas_rate",
+    "power": "power",
+}
+
+# Sensor device classes that map to a bucket only for daily utility meters
+_DAILY_METER_BUCKETS: Dict[str, str] = {
+    "gas": "gas_daily",
+    "energy": "energy_daily",
+}
+
+_AREA_BUCKETS = (
+    list(_DOMAIN_BUCKETS.values()) + list(_SENSOR_BUCKETS.values()) + list(_DAILY_METER_BUCKETS.values())
+)
+
+
+def _entity_record(eid: str) -> Dict:
+    """Read an entity's state once into the fields the card builders need, including its sort key."""
+    st = hass.states.get(eid)
+    attrs = (st.attributes if st else None) or {}
+    friendly_name = attrs.get("friendly_name") or eid
+    return {
+        "entity_id": eid,
+        "domain": _dom(eid),
+        "device_class": attrs.get("device_class") or "",
+        "meter": attrs.get("meter"),
+        "unit": attrs.get("unit_of_measurement"),
+        "friendly_name": friendly_name,
+        "sort_key": friendly_name.lower(),
+        "utility_meter": ("last_period" in attrs) or ("meter_period" in attrs),
+    }
+
+
+def _records_for(eids: List[str], cache: Dict[str, Dict]) -> List[Dict]:
+    """Deduplicated records for eids, reading each entity's state at most once per cache."""
+    out = []
+    for e in _dedupe_preserve_order(eids):
+        if e not in cache:
+            cache[e] = _entity_record(e)
+        out.append(cache[e])
+    return out
+
+
+def _classify_entities(eids: List[str], snap: Dict) -> Dict[str, List[Dict]]:
+    """Route each entity's record to its _cards_for_area section bucket in a single pass."""
+    buckets: Dict[str, List[Dict]] = {name: [] for name in _AREA_BUCKETS}
+    for rec in _records_for(eids, snap["records"]):
+        dom = rec["domain"]
+        if dom in _DOMAIN_BUCKETS:
+            buckets[_DOMAIN_BUCKETS[dom]].append(rec)
+        elif dom == "sensor":
+            dc = rec["device_class"]
+            if dc in _SENSOR_BUCKETS:
+                buckets[_SENSOR_BUCKETS[dc]].append(rec)
+            elif dc in _DAILY_METER_BUCKETS and rec["meter"] in ["daily", "daily_total"]:
+                buckets[_DAILY_METER_BUCKETS[dc]].append(rec)
+    return buckets
+
+
+def _sort_key(rec: Dict) -> str:
+    return rec["sort_key"]
+
+
+def _sorted_records(recs: List[Dict]) -> List[Dict]:
+    return sorted(recs, key=_sort_key)
+
+
 # ----- area → cards ---------------------------------------------------
 
 
-async def _cards_for_area(area_name: str) -> List[dict]:
-    eids = await _entities_in_area(area_name)
+async def _cards_for_area(area_name: str, snap: Dict) -> List[dict]:
+    eids = _entities_in_area(area_name, snap)
+    b = _classify_entities(eids, snap)
     cards: List[dict] = []
 
     # Area header card
@@ -377,21 +517,20 @@ async def _cards_for_area(area_name: str) -> List[dict]:
         "tap_action": {"action": "more-info"},
     })
 
-    # Binary sensors → chips (quick status)
-    bin_e = [e for e in eids if _dom(e) == "binary_sensor"]
-    if bin_e:
+    # Binary sensors → chips (quick status), presented through their ui_chip_* sensors
+    if b["binary"]:
         chips = []
-        for e in _sorted(bin_e):
-            dc = (hass.states.get(e).attributes.get("device_class") if hass.states.get(e) else "") or "default"
+        area_chips = snap["chips"][area_name] = []
+        for r in _sorted_records(b["binary"]):
+            e = r["entity_id"]
+            area_chips.append((e, r["device_class"] or "default"))
+            s = _chip_sensor(e)
             chips.append({
                 "type": "template",
                 "entity": e,
-                "content": (
-                    f"{{% from 'main.jinja' import get_name, get_short_desc %}}{{{{ get_name(entity, app='{dc}') }}}}:"
-                    f" {{{{ get_short_desc(entity, app='{dc}') }}}}"
-                ),
-                "icon": f"{{% from 'main.jinja' import get_icon %}}{{{{ get_icon(entity, app='{dc}') }}}}",
-                "icon_color": f"{{% from 'main.jinja' import get_color %}}{{{{ get_color(entity, app='{dc}') }}}}",
+                "content": f"{{{{ state_attr('{s}', 'name') }}}}: {{{{ state_attr('{s}', 'short_desc') }}}}",
+                "icon": f"{{{{ state_attr('{s}', 'icon') }}}}",
+                "icon_color": f"{{{{ state_attr('{s}', 'color') }}}}",
                 "tap_action": {"action": "more-info"},
             })
         cards.append({"type": "custom:mushroom-chips-card", "alignment": "center", "chips": chips})
@@ -399,46 +538,36 @@ async def _cards_for_area(area_name: str) -> List[dict]:
     vertical_opts = [{"layout": "vertical"}, {"multiline_secondary": False}, {"options": "vert_delim= • "}]
 
     # Comfort & Climate
-    temp = [
-        e
-        for e in eids
-        if _dom(e) == "sensor"
-        and (hass.states.get(e) and hass.states.get(e).attributes.get("device_class") == "temperature")
-    ]
-    hum = [
-        e
-        for e in eids
-        if _dom(e) == "sensor"
-        and (hass.states.get(e) and hass.states.get(e).attributes.get("device_class") == "humidity")
-    ]
-    climates = [e for e in eids if _dom(e) == "climate"]
-    humidifiers = [e for e in eids if _dom(e) == "humidifier"]
+    temp = b["temp"]
+    hum = b["hum"]
+    climates = b["climates"]
+    humidifiers = b["humidifiers"]
 
     if temp or hum or climates or humidifiers:
         sec_cards = []
-        for e in _sorted(temp):
+        for r in _sorted_records(temp):
             sec_cards.append({
                 "type": "custom:decluttering-card",
                 "template": "template_card",
-                "variables": [{"entity": e}, {"app": "ambient"}] + vertical_opts,
+                "variables": [{"entity": r["entity_id"]}, {"app": "ambient"}] + vertical_opts,
             })
-        for e in _sorted(hum):
+        for r in _sorted_records(hum):
             sec_cards.append({
                 "type": "custom:decluttering-card",
                 "template": "template_card",
-                "variables": [{"entity": e}, {"app": "indoor"}] + vertical_opts,
+                "variables": [{"entity": r["entity_id"]}, {"app": "indoor"}] + vertical_opts,
             })
-        for e in _sorted(climates):
+        for r in _sorted_records(climates):
             sec_cards.append({
                 "type": "custom:mushroom-climate-card",
-                "entity": e,
+                "entity": r["entity_id"],
                 "tap_action": {"action": "more-info"},
                 "layout": "vertical",
             })
-        for e in _sorted(humidifiers):
+        for r in _sorted_records(humidifiers):
             sec_cards.append({
                 "type": "custom:mushroom-humidifier-card",
-                "entity": e,
+                "entity": r["entity_id"],
                 "tap_action": {"action": "more-info"},
                 "layout": "vertical",
             })
@@ -449,88 +578,76 @@ async def _cards_for_area(area_name: str) -> List[dict]:
         ]
 
     # Switches
-    switches = [e for e in eids if _dom(e) == "switch"]
-    if switches:
+    if b["switches"]:
         cards += [
             _title("Switches & Outlets"),
             _grid(
                 [
                     {
                         "type": "custom:mushroom-entity-card",
-                        "entity": e,
+                        "entity": r["entity_id"],
                         "tap_action": {"action": "more-info"},
                     }
-                    for e in _sorted(switches)
+                    for r in _sorted_records(b["switches"])
                 ],
                 cols=2,
             ),
         ]
 
     # Lights
-    lights = [e for e in eids if _dom(e) == "light"]
-    if lights:
+    if b["lights"]:
         cards += [
             _title("Lighting"),
             _grid(
                 [
                     {
                         "type": "custom:mushroom-light-card",
-                        "entity": e,
+                        "entity": r["entity_id"],
                         "tap_action": {"action": "more-info"},
                         "layout": "vertical",
                     }
-                    for e in _sorted(lights)
+                    for r in _sorted_records(b["lights"])
                 ],
                 cols=2,
             ),
         ]
 
     # Fans
-    fans = [e for e in eids if _dom(e) == "fan"]
-    if fans:
+    if b["fans"]:
         cards += [
             _title("Airflow"),
             _grid(
                 [
                     {
                         "type": "custom:mushroom-fan-card",
-                        "entity": e,
+                        "entity": r["entity_id"],
                         "tap_action": {"action": "more-info"},
                         "layout": "vertical",
                     }
-                    for e in _sorted(fans)
+                    for r in _sorted_records(b["fans"])
                 ],
                 cols=2,
             ),
         ]
 
     # Power & Energy
-    gas_rate = [
-        e
-        for e in eids
-        if _dom(e) == "sensor"
-        and (hass.states.get(e) and hass.states.get(e).attributes.get("device_class") == "volume_flow_rate")
-    ]
-    power = [
-        e
-        for e in eids
-        if _dom(e) == "sensor" and (hass.states.get(e) and hass.states.get(e).attributes.get("device_class") == "power")
-    ]
+    gas_rate = b["gas_rate"]
+    power = b["power"]
 
     if gas_rate or power:
         sec_cards = []
-        for e in _sorted(gas_rate):
+        for r in _sorted_records(gas_rate):
             sec_cards.append({
                 "type": "custom:decluttering-card",
                 "template": "template_card",
-                "variables": [{"entity": e}, {"app": "gas_rate"}, {"width": "narrow"}],
+                "variables": [{"entity": r["entity_id"]}, {"app": "gas_rate"}, {"width": "narrow"}],
             })
-        for e in _sorted(power):
-            app = "mains" if hass.states.get(e).attributes.get("friendly_name").lower() == "mains power" else "default"
+        for r in _sorted_records(power):
+            app = "mains" if r["friendly_name"].lower() == "mains power" else "default"
             sec_cards.append({
                 "type": "custom:decluttering-card",
                 "template": "template_card",
-                "variables": [{"entity": e}, {"app": app}, {"width": "narrow"}],
+                "variables": [{"entity": r["entity_id"]}, {"app": app}, {"width": "narrow"}],
             })
 
         cards += [
@@ -539,53 +656,28 @@ async def _cards_for_area(area_name: str) -> List[dict]:
         ]
 
     # Utility Meters
-    logger.debug(f"Entities being processed: {eids}")
-    for e in eids:
-        entity = hass.states.get(e)
-        if entity:
-            device_class = entity.attributes.get("device_class")
-            meter = entity.attributes.get("meter")
-            logger.debug(f"Entity: {e}, Device Class: {device_class}, Meter: {meter}")
-    gas_daily = [
-        e
-        for e in eids
-        if _dom(e) == "sensor"
-        and (
-            hass.states.get(e)
-            and hass.states.get(e).attributes.get("device_class") == "gas"
-            and hass.states.get(e).attributes.get("meter") in ["daily", "daily_total"]
-        )
-    ]
-    energy_daily = [
-        e
-        for e in eids
-        if _dom(e) == "sensor"
-        and (
-            hass.states.get(e)
-            and hass.states.get(e).attributes.get("device_class") == "energy"
-            and hass.states.get(e).attributes.get("meter") in ["daily", "daily_total"]
-        )
-    ]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Entities being processed: %s", eids)
+        for r in b["gas_daily"] + b["energy_daily"]:
+            logger.debug("Entity: %s, Device Class: %s, Meter: %s", r["entity_id"], r["device_class"], r["meter"])
+    gas_daily = b["gas_daily"]
+    energy_daily = b["energy_daily"]
 
     if gas_daily or energy_daily:
         sec_cards = []
-        for e in _sorted(gas_daily):
-            app = "daily" if hass.states.get(e).attributes.get("meter") == "daily" else "daily_appliance"
+        for r in _sorted_records(gas_daily):
+            app = "daily" if r["meter"] == "daily" else "daily_appliance"
             sec_cards.append({
                 "type": "custom:decluttering-card",
                 "template": "template_card",
-                "variables": [{"entity": e}, {"app": app}, {"project_daily": "true"}] + vertical_opts,
+                "variables": [{"entity": r["entity_id"]}, {"app": app}, {"project_daily": "true"}] + vertical_opts,
             })
-        for e in _sorted(energy_daily):
-            app = (
-                "energy_daily_house"
-                if hass.states.get(e).attributes.get("meter") == "daily_total"
-                else "energy_daily_area"
-            )
+        for r in _sorted_records(energy_daily):
+            app = "energy_daily_house" if r["meter"] == "daily_total" else "energy_daily_area"
             sec_cards.append({
                 "type": "custom:decluttering-card",
                 "template": "template_card",
-                "variables": [{"entity": e}, {"app": app}, {"project_daily": "true"}] + vertical_opts,
+                "variables": [{"entity": r["entity_id"]}, {"app": app}, {"project_daily": "true"}] + vertical_opts,
             })
 
         cards += [
@@ -594,8 +686,7 @@ async def _cards_for_area(area_name: str) -> List[dict]:
         ]
 
     # Covers
-    covers = [e for e in eids if _dom(e) == "cover"]
-    if covers:
+    if b["covers"]:
         cards += [
             _title("Shades & Covers"),
             {
@@ -603,36 +694,34 @@ async def _cards_for_area(area_name: str) -> List[dict]:
                 "cards": [
                     {
                         "type": "custom:mushroom-cover-card",
-                        "entity": e,
+                        "entity": r["entity_id"],
                         "tap_action": {"action": "more-info"},
                     }
-                    for e in _sorted(covers)
+                    for r in _sorted_records(b["covers"])
                 ],
             },
         ]
 
     # Locks
-    locks = [e for e in eids if _dom(e) == "lock"]
-    if locks:
+    if b["locks"]:
         cards += [
             _title("Access & Locks"),
             _grid(
                 [
                     {
                         "type": "custom:mushroom-lock-card",
-                        "entity": e,
+                        "entity": r["entity_id"],
                         "tap_action": {"action": "more-info"},
                         "layout": "vertical",
                     }
-                    for e in _sorted(locks)
+                    for r in _sorted_records(b["locks"])
                 ],
                 cols=2,
             ),
         ]
 
     # Media players
-    media = [e for e in eids if _dom(e) == "media_player"]
-    if media:
+    if b["media"]:
         cards += [
             _title("Audio & Video"),
             {
@@ -640,27 +729,26 @@ async def _cards_for_area(area_name: str) -> List[dict]:
                 "cards": [
                     {
                         "type": "custom:mushroom-media-player-card",
-                        "entity": e,
+                        "entity": r["entity_id"],
                         "tap_action": {"action": "more-info"},
                     }
-                    for e in _sorted(media)
+                    for r in _sorted_records(b["media"])
                 ],
             },
         ]
 
     # Automations
-    automations = [e for e in eids if _dom(e) == "automation"]
-    if automations:
+    if b["automations"]:
         cards += [
             _title("Automations & Scripts"),
             _grid(
                 [
                     {
                         "type": "custom:mushroom-entity-card",
-                        "entity": e,
+                        "entity": r["entity_id"],
                         "tap_action": {"action": "more-info"},
                     }
-                    for e in _sorted(automations)
+                    for r in _sorted_records(b["automations"])
                 ],
                 cols=2,
             ),
@@ -671,46 +759,16 @@ async def _cards_for_area(area_name: str) -> List[dict]:
 
         series = [
             {
-                "entity": e,
+                "entity": r["entity_id"],
                 "yaxis_id": "temp",
-                "transform": (
-                    "return x*9/5 + 32;"
-                    if hass.states.get(e).attributes.get("unit_of_measurement") == "°C"
-                    else "return x;"
-                ),
+                "transform": "return x*9/5 + 32;" if r["unit"] == "°C" else "return x;",
             }
-            for e in temp
-        ] + [{"entity": e, "yaxis_id": "hum"} for e in hum]
+            for r in temp
+        ] + [{"entity": r["entity_id"], "yaxis_id": "hum"} for r in hum]
 
         cards += [
             _title("Climate Trends"),
-            {
-                "type": "custom:apexcharts-card",
-                "graph_span": "24h",
-                "apex_config": {
-                    "yaxis": [
-                        {
-                            "id": "temp",
-                            "opposite": False,
-                            "forceNiceScale": True,
-                            "title": {"text": "Temperature (°F)"},
-                            "labels": {"formatter": "EVAL:function(val) { return Number(val).toFixed(1); }"},
-                        },
-                        {
-                            "id": "hum",
-                            "opposite": True,
-                            "forceNiceScale": True,
-                            "title": {"text": "Humidity (%)"},
-                            "labels": {"formatter": "EVAL:function(val) { return Number(val).toFixed(0); }"},
-                        },
-                    ],
-                    "tooltip": {
-                        "shared": True,
-                        "y": {"formatter": "EVAL:function(val) { return Number(val).toFixed(2); }"},
-                    },
-                },
-                "series": series,
-            },
+            _trend_chart("climate_trends_chart", series),
         ]
 
     # Utility History
@@ -718,78 +776,35 @@ async def _cards_for_area(area_name: str) -> List[dict]:
 
         series = [
             {
-                "entity": e,
+                "entity": r["entity_id"],
                 "yaxis_id": "energy",
-                "transform": (
-                    "return x/1000;"
-                    if hass.states.get(e).attributes.get("unit_of_measurement") == "Wh"
-                    else "return x;"
-                ),
-                "type": "column",
-                "group_by": {
-                    "duration": "1d",
-                    "func": "max",
-                },
+                "transform": "return x/1000;" if r["unit"] == "Wh" else "return x;",
             }
-            for e in energy_daily
+            for r in energy_daily
         ] + [
             {
-                "entity": e,
+                "entity": r["entity_id"],
                 "yaxis_id": "gas",
                 "transform": (
                     "return x*35.3147;"
-                    if hass.states.get(e).attributes.get("unit_of_measurement") == "m³"
-                    else (
-                        "return x/100;"
-                        if hass.states.get(e).attributes.get("unit_of_measurement") == "CCF"
-                        else "return x;"
-                    )
+                    if r["unit"] == "m³"
+                    else ("return x/100;" if r["unit"] == "CCF" else "return x;")
                 ),
-                "type": "column",
-                "group_by": {
-                    "duration": "1d",
-                    "func": "max",
-                },
             }
-            for e in gas_daily
+            for r in gas_daily
         ]
 
         cards += [
             _title("Utility Trends"),
-            {
-                "type": "custom:apexcharts-card",
-                "graph_span": "7d",
-                "apex_config": {
-                    "yaxis": [
-                        {
-                            "id": "energy",
-                            "opposite": False,
-                            "forceNiceScale": True,
-                            "title": {"text": f"Energy (kWh)"},
-                            "labels": {"formatter": "EVAL:function(val) { return Number(val).toFixed(1); }"},
-                        },
-                        {
-                            "id": "gas",
-                            "opposite": True,
-                            "forceNiceScale": True,
-                            "title": {"text": f"Gas (ft³)"},
-                            "labels": {"formatter": "EVAL:function(val) { return Number(val).toFixed(1); }"},
-                        },
-                    ],
-                    "tooltip": {
-                        "shared": True,
-                        "y": {"formatter": "EVAL:function(val) { return Number(val).toFixed(2); }"},
-                    },
-                },
-                "series": series,
-            },
+            _trend_chart("utility_trends_chart", series),
         ]
 
     return cards
 
 
-def _card_for_entity_system(eid: str, app_override: str = None) -> dict:
-    dom = _dom(eid)
+def _card_for_entity_system(rec: Dict, app_override: str = None) -> dict:
+    eid = rec["entity_id"]
+    dom = rec["domain"]
 
     if dom == "light":
         return {
@@ -841,9 +856,8 @@ def _card_for_entity_system(eid: str, app_override: str = None) -> dict:
 
     # Sensors and binary_sensors, reuse your decluttering template_card so names/icons/colors stay consistent
     if dom in ["sensor", "binary_sensor"]:
-        st = hass.states.get(eid)
-        dc = (st and st.attributes.get("device_class")) or "default"
-        mt = (st and st.attributes.get("meter")) or None
+        dc = rec["device_class"] or "default"
+        mt = rec["meter"] or None
         vertical_opts = []
 
         if mt:
@@ -868,172 +882,543 @@ def _statistics_graph_card(title: str, entities: List[str], card_opts: Dict) ->
     return c
 
 
-def _filter_entities(all_eids: List[str], rule: Dict) -> List[str]:
+def _filter_entities(records: List[Dict], rule: Dict) -> List[Dict]:
+    """Records matching rule, in the order given (already sorted for _system_context lists)."""
     domains = set(rule.get("domains", []))
     dclasses = set(rule.get("device_classes", [])) if rule.get("device_classes") else None
 
-    out: List[str] = []
-    for e in all_eids:
-        if domains and _dom(e) not in domains:
+    out: List[Dict] = []
+    for r in records:
+        if domains and r["domain"] not in domains:
             continue
-        if dclasses is not None and _device_class(e) not in dclasses:
+        if dclasses is not None and r["device_class"] not in dclasses:
             continue
-        if rule.get("outlets_only") and not _is_outlet_switch(e):
+        if rule.get("outlets_only") and not _is_outlet_switch(r):
             continue
-        if rule.get("exclude_outlets") and _is_outlet_switch(e):
+        if rule.get("exclude_outlets") and _is_outlet_switch(r):
             continue
-        if rule.get("utility_meter_only") and not _is_utility_meter_sensor(e):
+        if rule.get("utility_meter_only") and not _is_utility_meter_sensor(r):
             continue
-        out.append(e)
-    return _sorted(out)
+        out.append(r)
+    return out
 
 
-async def _cards_for_system_groups(sys_def: Dict) -> List[dict]:
-    """Systems dashboard: sections per device type, with floor subsections."""
-    areas = await _all_areas_in_order()
-    floor_groups = await _areas_grouped_by_floor(areas)
+def _system_context(snap: Dict) -> Dict:
+    """Floor-grouped entity records for the systems dashboard, computed once and shared by every view.
 
-    # Collect all entities across all areas for shared charts
+    Returns {"all": [record, ...], "floors": [{"floor_name": str, "records": [record, ...]}, ...]},
+    each list sorted by friendly name so filtered subsets come out sorted too.
+    """
+    areas = _all_areas_in_order(snap)
+    records = snap["records"]
+
+    floors = []
+    for fg in _areas_grouped_by_floor(areas, snap):
+        floor_eids: List[str] = []
+        for area_id in fg["areas"]:
+            floor_eids.extend(_entities_in_area(area_id, snap))
+        floors.append({"floor_name": fg["floor_name"], "records": _sorted_records(_records_for(floor_eids, records))})
+
+    # All entities across all areas for shared charts
     all_eids: List[str] = []
     for area_id in areas:
-        all_eids.extend(await _entities_in_area(area_id))
+        all_eids.extend(_entities_in_area(area_id, snap))
+
+    return {"all": _sorted_records(_records_for(all_eids, records)), "floors": floors}
+
 
-    all_eids = _dedupe_preserve_order(all_eids)
+async def _cards_for_system_groups(sys_def: Dict, ctx: Dict) -> List[Tuple[str, Any]]:
+    """Systems dashboard: sections per device type, with floor subsections.
 
-    view_cards: List[dict] = []
+    Returns (fragment_name, content) pairs: each group's card list gets its own
+    fragment name, while the top-of-view charts stay inline cards (empty name).
+    """
+    view_cards: List[Tuple[str, Any]] = []
 
     # Optional charts at top of the view (used for Utility Meters)
     for ch in sys_def.get("charts", []):
-        ents = _filter_entities(all_eids, ch)
+        ents = _filter_entities(ctx["all"], ch)
         if not ents:
             continue
-        view_cards += [
-            _statistics_graph_card(ch["title"], ents, ch["card"]),
-        ]
+        view_cards.append(("", _statistics_graph_card(ch["title"], [r["entity_id"] for r in ents], ch["card"])))
 
     # Device-type groupings, organized with per-floor subsections
-    for g in sys_def.get("groups", []):
+    for gi, g in enumerate(sys_def.get("groups", [])):
         group_cards: List[dict] = []
 
-        for fg in floor_groups:
-            floor_eids: List[str] = []
-            for area_id in fg["areas"]:
-                floor_eids.extend(await _entities_in_area(area_id))
-            floor_eids = _dedupe_preserve_order(floor_eids)
-
-            filtered = _filter_entities(floor_eids, g)
+        for fl in ctx["floors"]:
+            filtered = _filter_entities(fl["records"], g)
             if not filtered:
                 continue
 
             group_cards += [
-                _title(fg["floor_name"]),
-                _grid([_card_for_entity_system(e, app_override=g.get("app")) for e in _sorted(filtered)], cols=2),
+                _title(fl["floor_name"]),
+                _grid(
+                    [_card_for_entity_system(r, app_override=g.get("app")) for r in filtered],
+                    cols=2,
+                ),
             ]
 
         if group_cards:
             group_cards = [_title("", g["title"])] + group_cards
-            view_cards.append({
-                "type": "custom:stack-in-card",
-                "mode": "vertical",
-                "keep": {
-                    "background": True,
-                    "box_shadow": True,
-                    "border_radius": True,
-                },
-                "card_mod": {
-                    "style": (
-                        "ha-card { border-radius: 12px; background: var(--card-background-color);"
-                        " box-shadow: var(--ha-card-box-shadow, 0 2px 6px rgba(0,0,0,.2)); padding:"
-                        " 8px; }"
-                    ),
-                },
-                "cards": group_cards,
-            })
+            fragment = f"{gi + 1:02d}_{_slug(g['title'])}"
+            view_cards.append((fragment, group_cards))
 
     return view_cards
 
 
+# ----- chip presentation sensors --------------------------------------
+
+
+def _chip_sensor(entity_id: str) -> str:
+    return f"sensor.ui_chip_{_slug(entity_id)}"
+
+
+def _chip_package(chips: Dict[str, str]) -> Dict:
+    """Package with one trigger-based presentation sensor per chip entity ({entity_id: app}).
+
+    Each sensor runs get_device_state_info once per state change of its entity (and on start or
+    template reload) and keeps CHIP_FIELDS as attributes for the chip's content, icon and color.
+    """
+    fields = ", ".join(f"'{f}'" for f in CHIP_FIELDS)
+    entries = []
+    for eid in sorted(chips):
+        entries.append({
+            "trigger": [
+                {"platform": "state", "entity_id": eid},
+                {"platform": "homeassistant", "event": "start"},
+                {"platform": "event", "event_type": "event_template_reloaded"},
+            ],
+            "variables": {
+                "state_info": (
+                    "{%- from 'main.jinja' import get_device_state_info -%}"
+                    f"{{{{ get_device_state_info('{eid}', '{chips[eid]}', fields=[{fields}]) | from_json }}}}"
+                ),
+            },
+            "sensor": [{
+                "name": _chip_sensor(eid).split(".", 1)[1],
+                "unique_id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"build_area_views/chip/{eid}")),
+                "state": f"{{{{ states('{eid}') }}}}",
+                "attributes": {f: f"{{{{ state_info.{f} }}}}" for f in CHIP_FIELDS},
+            }],
+        })
+    return {"template": entries}
+
+
+@pyscript_compile
+def _dump_package(path: str, doc: dict) -> int:
+    """Write a generated package unless unchanged; returns the bytes written (0 when unchanged)."""
+    text = "# GENERATED by pyscript/build_area_views.py; do not edit.\n" + yaml.dump(
+        doc, Dumper=_ViewDumper, sort_keys=False
+    )
+    return len(text.encode("utf-8")) if _write_if_changed(path, text) else 0
+
+
+async def _write_chip_package(metrics: Dict) -> None:
+    """Regenerate the chip package from every area view's chips, reloading templates if it changed."""
+    if any(key not in _CHIP_ENTITIES for key in VIEW_DEFS):
+        return  # not every area view has been built yet; a partial package would drop sensors
+    chips: Dict[str, str] = {}
+    for key in VIEW_DEFS:
+        for eid, app in _CHIP_ENTITIES[key]:
+            chips.setdefault(eid, app)
+
+    t0 = time.perf_counter()
+    written = await task.executor(_dump_package, f"{CHIP_PACKAGE_DIR}/{CHIP_PACKAGE_NAME}", _chip_package(chips))
+    _add_phase(metrics, "write", time.perf_counter() - t0)
+    if written:
+        metrics["files_written"] += 1
+        metrics["bytes_written"] += written
+        # Added or removed chip sensors only exist once the template integration reloads
+        service.call("template", "reload")
+        logger.info("[area-views] chip package updated (%d chip sensors)", len(chips))
+
+
 # ----- view builder ---------------------------------------------------
 
 
-async def _write_view_file(view_key: str, view_title: str, areas: List[str]) -> None:
+@pyscript_compile
+def _write_if_changed(path: str, text: str) -> bool:
+    """Atomically replace path with text unless its content hash already matches; returns True if written."""
+    data = text.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    except FileNotFoundError:
+        pass
+
+    # Write beside the target, then rename over it so readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+class _Include(str):
+    """Relative path emitted as a `!include` tag in a generated view."""
+
+
+class _ViewDumper(yaml.SafeDumper):
+    """SafeDumper that understands _Include."""
+
+
+@pyscript_compile
+def _represent_include(dumper, data):
+    return dumper.represent_scalar("!include", str(data))
+
+
+_ViewDumper.add_representer(_Include, _represent_include)
+
+
+@pyscript_compile
+def _dump_view(path: str, doc: dict, fragments: Dict[str, Any], fragment_dir: str) -> Dict:
+    """Serialize a view and its fragment files, writing only the files whose content changed.
+
+    Runs as one executor job per view so the event loop never blocks on it. Fragments
+    are written before the view that includes them, then the view, and only then are
+    .yaml files in fragment_dir the view no longer includes removed, so a view on disk
+    never includes a missing file. Returns {"files": written or removed,
+    "bytes": serialized, "bytes_written": of changed files, "serialize": secs, "write": secs}.
+    """
+    out = {"files": 0, "bytes": 0, "bytes_written": 0, "serialize": 0.0, "write": 0.0}
+
+    def _emit(target, data):
+        t0 = time.perf_counter()
+        text = yaml.dump(data, Dumper=_ViewDumper, sort_keys=False)
+        t1 = time.perf_counter()
+        changed = _write_if_changed(target, text)
+        out["serialize"] += t1 - t0
+        out["write"] += time.perf_counter() - t1
+        size = len(text.encode("utf-8"))
+        out["bytes"] += size
+        if changed:
+            out["files"] += 1
+            out["bytes_written"] += size
+
+    for frag_path, frag in fragments.items():
+        _emit(frag_path, frag)
+
+    _emit(path, doc)
+
+    # Only once the new view is in place does nothing include the stale fragments any more
+    t0 = time.perf_counter()
+    if os.path.isdir(fragment_dir):
+        for name in os.listdir(fragment_dir):
+            stale = os.path.join(fragment_dir, name)
+            if name.endswith(".yaml") and stale not in fragments:
+                os.remove(stale)
+                out["files"] += 1
+    out["write"] += time.perf_counter() - t0
+    return out
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def _include_cards(view_path: str, fragment_dir: str, named_cards: List[Tuple[str, Any]]) -> Tuple[List, Dict]:
+    """Split (fragment_name, content) pairs into the view's card list and {fragment_path: card list}.
+
+    Named entries are card lists: each is written to its own fragment and shown in the view as a
+    stack_in_card whose cards are an `!include` relative to the view file. Unnamed ones stay inline.
+    """
+    cards = []
+    fragments: Dict[str, Any] = {}
+    for name, content in named_cards:
+        if not name:
+            cards.append(content)
+            continue
+        frag_path = f"{fragment_dir}/{name}.yaml"
+        fragments[frag_path] = content
+        cards.append(_stack_card(_Include(os.path.relpath(frag_path, os.path.dirname(view_path)))))
+    return cards, fragments
+
+
+def _add_phase(metrics: Dict, phase: str, secs: float) -> None:
+    metrics["phases"][phase] = metrics["phases"].get(phase, 0.0) + secs
 
-    view_cards: List[dict] = []
+
+def _record_dump(metrics: Dict, dumped: Dict) -> None:
+    """Fold one _dump_view result into the build metrics."""
+    _add_phase(metrics, "serialize", dumped["serialize"])
+    _add_phase(metrics, "write", dumped["write"])
+    metrics["files_written"] += dumped["files"]
+    metrics["bytes_written"] += dumped["bytes_written"]
+
+
+async def _write_view_file(view_key: str, view_title: str, areas: List[str], snap: Dict, metrics: Dict) -> None:
+    view_cards: List[Tuple[str, Any]] = []
+    t0 = time.perf_counter()
 
     for area in areas:
         try:
-            area_cards = await _cards_for_area(area)
+            area_cards = await _cards_for_area(area, snap)
         except Exception as e:
             logger.error(f"[area-views] building cards failed for '{area}': {e}")
             area_cards = [{"type": "markdown", "content": f"**Error building area '{area}':** `{e}`"}]
 
-        view_cards.append({
-            "type": "custom:stack-in-card",
-            "mode": "vertical",
-            "keep": {
-                "background": True,
-                "box_shadow": True,
-                "border_radius": True,
-            },
-            "card_mod": {
-                "style": (
-                    "ha-card { border-radius: 12px; background: var(--card-background-color);"
-                    " box-shadow: var(--ha-card-box-shadow, 0 2px 6px rgba(0,0,0,.2)); padding:"
-                    " 8px; }"
-                ),
-            },
-            "cards": area_cards,
-        })
+        view_cards.append((area, area_cards))
+    _add_phase(metrics, "cards", time.perf_counter() - t0)
 
-    # 1) Ensure directory (stdlib function; pass exist_ok=True positionally)
-    await task.executor(os.makedirs, OUT_DIR, 0o777, True)  # name, mode, exist_ok
+    path = f"{OUT_DIR}/{view_key}.yaml"
+    fragment_dir = f"{FRAGMENTS_DIR}/{view_key}"
+    cards, fragments = _include_cards(path, fragment_dir, view_cards)
+    dumped = await task.executor(
+        _dump_view, path, {"title": view_title, "type": "masonry", "cards": cards}, fragments, fragment_dir
+    )
+    _record_dump(metrics, dumped)
+
+    logger.info(
+        "[area-views] %s: %d file(s) changed (%d area blocks, %d bytes)",
+        path,
+        dumped["files"],
+        len(areas),
+        dumped["bytes"],
+    )
+
+
+async def _write_system_view_file(view_key: str, view_title: str, sys_def: Dict, ctx: Dict, metrics: Dict) -> None:
+    t0 = time.perf_counter()
+    try:
+        view_cards = await _cards_for_system_groups(sys_def, ctx)
+    except Exception as e:
+        logger.error(f"[system-views] building cards failed for '{view_key}': {e}")
+        view_cards = [("", {"type": "markdown", "content": f"**Error building view '{view_key}':** `{e}`"})]
+    _add_phase(metrics, "cards", time.perf_counter() - t0)
 
-    # 2) Serialize YAML in-memory (cheap CPU, fine on event loop)
-    yaml_str = yaml.safe_dump({"title": view_title, "type": "masonry", "cards": view_cards}, sort_keys=False)
+    path = f"{SYSTEMS_OUT_DIR}/{view_key}.yaml"
+    fragment_dir = f"{SYSTEMS_FRAGMENTS_DIR}/{view_key}"
+    cards, fragments = _include_cards(path, fragment_dir, view_cards)
+    dumped = await task.executor(
+        _dump_view, path, {"title": view_title, "type": "masonry", "cards": cards}, fragments, fragment_dir
+    )
+    _record_dump(metrics, dumped)
+
+    logger.info(
+        "[system-views] %s: %d file(s) changed (%d cards, %d bytes)",
+        path,
+        dumped["files"],
+        len(view_cards),
+        dumped["bytes"],
+    )
+
+
+def _fingerprint(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _area_view_fingerprint(view_def: Dict, snap: Dict) -> str:
+    """Hash of everything an area view is built from: its areas and their entity records."""
+    parts = []
+    for area in view_def["areas"]:
+        eids = _entities_in_area(area, snap)
+        parts.append([area, area in snap["areas"], _records_for(eids, snap["records"])])
+    return _fingerprint([view_def["title"], parts])
+
+
+def _system_view_fingerprint(sys_def: Dict, ctx: Dict) -> str:
+    """Hash of the filtered entity records, per chart and per group/floor, that a system view renders."""
+    parts = []
+    for ch in sys_def.get("charts", []):
+        parts.append([ch["title"], ch["card"], [r["entity_id"] for r in _filter_entities(ctx["all"], ch)]])
+    for g in sys_def.get("groups", []):
+        parts.append([g, [[fl["floor_name"], _filter_entities(fl["records"], g)] for fl in ctx["floors"]]])
+    return _fingerprint([sys_def["title"], parts])
 
-    # 3) Write using a stdlib bound method as the callable
-    path = f"{OUT_DIR}/{view_key}.yaml"
-    await task.executor(Path(path).write_text, yaml_str, "utf-8")
 
-    area_count = len(areas)
-    logger.info(f"[area-views] wrote {path} ({area_count} area blocks)")
+async def _run_bounded(func, arg_lists: List[list], limit: int) -> None:
+    """Run func(*args) for each args as concurrent tasks, at most limit at a time."""
+    running = set()
+    for args in arg_lists:
+        if len(running) >= limit:
+            _, running = await task.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        running.add(task.create(func, *args))
+    if running:
+        await task.wait(running)
 
 
-async def _write_system_view_file(view_key: str, view_title: str, sys_def: Dict) -> None:
+async def _rebuild_one(build: Dict, kind: str, key: str, fp: str) -> None:
+    """Write one area or system view and record the fingerprint it was built from."""
     try:
-        view_cards = await _cards_for_system_groups(sys_def)
+        if kind == "area":
+            val = VIEW_DEFS[key]
+            await _write_view_file(key, val["title"], val["areas"], build["snap"], build["metrics"])
+            chips = build["snap"]["chips"]
+            _CHIP_ENTITIES[key] = [c for area in val["areas"] for c in chips.get(area, [])]
+        else:
+            sys_def = SYSTEM_DEFS[key]
+            await _write_system_view_file(key, sys_def["title"], sys_def, build["ctx"], build["metrics"])
+        _VIEW_FINGERPRINTS[kind][key] = fp
+        build["rebuilt"] += 1
     except Exception as e:
-        logger.error(f"[system-views] building cards failed for '{view_key}': {e}")
-        view_cards = [{"type": "markdown", "content": f"**Error building view '{view_key}':** `{e}`"}]
+        logger.error(f"[{kind}-views] failed writing {key}: {e}")
+
+
+async def _rebuild_views(
+    area_keys: List[str] = None, system_keys: List[str] = None, force: bool = False
+) -> Tuple[int, int]:
+    """Regenerate the requested area and system views (all when None).
+
+    Unless force is set, a view is only rewritten when its input fingerprint
+    differs from the one it was last written from. Views are generated
+    concurrently, BUILD_CONCURRENCY at a time, and the build's timings are
+    published on METRICS_SENSOR. Returns (rebuilt, skipped).
+    """
+    started = time.perf_counter()
+    metrics = {"phases": {}, "files_written": 0, "bytes_written": 0}
+
+    # One registry snapshot shared by every area and system view in this build
+    snap = await _registry_snapshot()
+    _add_phase(metrics, "snapshot", time.perf_counter() - started)
+    build = {"snap": snap, "ctx": None, "rebuilt": 0, "metrics": metrics}
+    fps = _VIEW_FINGERPRINTS
+    jobs = []
+    skipped = 0
+
+    # Reading and classifying entity records happens while fingerprinting
+    t0 = time.perf_counter()
+
+    for key in VIEW_DEFS if area_keys is None else area_keys:
+        fp = _area_view_fingerprint(VIEW_DEFS[key], snap)
+        if not force and fps["area"].get(key) == fp:
+            skipped += 1
+            continue
+        jobs.append([build, "area", key, fp])
+
+    keys = SYSTEM_DEFS if system_keys is None else system_keys
+    if keys:
+        build["ctx"] = _system_context(snap)
+        for key in keys:
+            fp = _system_view_fingerprint(SYSTEM_DEFS[key], build["ctx"])
+            if not force and fps["system"].get(key) == fp:
+                skipped += 1
+                continue
+            jobs.append([build, "system", key, fp])
+    _add_phase(metrics, "classify", time.perf_counter() - t0)
+
+    await _run_bounded(_rebuild_one, jobs, BUILD_CONCURRENCY)
+    if any(kind == "area" for _, kind, _, _ in jobs):
+        await _write_chip_package(metrics)
+
+    rebuilt = build["rebuilt"]
+    duration = time.perf_counter() - started
+    logger.info(
+        "[area-views] rebuilt %d view(s), %d unchanged%s in %.3fs (%s)",
+        rebuilt,
+        skipped,
+        " (forced)" if force else "",
+        duration,
+        ", ".join([f"{k} {v:.3f}s" for k, v in metrics["phases"].items()]),
+    )
+    _publish_metrics(metrics, duration, rebuilt, skipped, len(snap["records"]), force)
+    return rebuilt, skipped
+
+
+def _publish_metrics(metrics: Dict, duration: float, rebuilt: int, skipped: int, entities: int, force: bool) -> None:
+    """Expose the last build on METRICS_SENSOR so slow dashboard generation can be alerted on.
+
+    Card, serialize and write phases are summed over views that may run concurrently.
+    """
+    attrs = {
+        "friendly_name": "Dashboard views build",
+        "unit_of_measurement": "s",
+        "state_class": "measurement",
+        "icon": "mdi:view-dashboard-edit",
+        "views_rebuilt": rebuilt,
+        "views_unchanged": skipped,
+        "forced": force,
+        "entities_processed": entities,
+        "files_written": metrics["files_written"],
+        "bytes_written": metrics["bytes_written"],
+    }
+    for phase, secs in metrics["phases"].items():
+        attrs[f"{phase}_seconds"] = round(secs, 4)
+    try:
+        state.set(METRICS_SENSOR, value=round(duration, 3), new_attributes=attrs)
+    except Exception as e:
+        logger.warning(f"[area-views] could not update {METRICS_SENSOR}: {e}")
 
-    await task.executor(os.makedirs, SYSTEMS_OUT_DIR, 0o777, True)
 
-    yaml_str = yaml.safe_dump({"title": view_title, "type": "masonry", "cards": view_cards}, sort_keys=False)
-    path = f"{SYSTEMS_OUT_DIR}/{view_key}.yaml"
-    await task.executor(Path(path).write_text, yaml_str, "utf-8")
+# ----- rebuild scheduler ----------------------------------------------
 
-    logger.info(f"[system-views] wrote {path} ({len(view_cards)} cards)")
 
+def _merge_keys(cur, new):
+    """Union of two requested key sets, where None means every view."""
+    if cur is None or new is None:
+        return None
+    return cur | new
 
-async def _build_all_system_views() -> None:
-    for key, sys_def in SYSTEM_DEFS.items():
-        try:
-            await _write_system_view_file(key, sys_def["title"], sys_def)
-        except Exception as e:
-            logger.error(f"[system-views] failed writing {key}: {e}")
+
+async def _request_rebuild(area_keys: List[str] = None, system_keys: List[str] = None, force: bool = False) -> None:
+    """Queue a rebuild of the given views (all when None), coalescing with any pending request."""
+    st = _SCHED
+    st["stats"]["requested"] += 1
+    req = {
+        "area": None if area_keys is None else set(area_keys),
+        "system": None if system_keys is None else set(system_keys),
+        "force": force,
+    }
+
+    if st["pending"] is None:
+        st["pending"] = req
+    else:
+        p = st["pending"]
+        p["area"] = _merge_keys(p["area"], req["area"])
+        p["system"] = _merge_keys(p["system"], req["system"])
+        p["force"] = p["force"] or force
+        st["stats"]["merged"] += 1
+
+    # (Re)start the quiet window
+    st["ready"] = False
+    task.create(_rebuild_after_quiet)
+
+
+async def _rebuild_after_quiet() -> None:
+    # A newer request kills this timer and starts its own
+    task.unique("build_area_views_quiet_window")
+    await task.sleep(REBUILD_QUIET_SECS)
+    _SCHED["ready"] = True
+    if not _SCHED["running"]:
+        # Run in its own task so a later task.unique() can't cancel a build in progress
+        task.create(_drain_rebuilds)
+
+
+async def _drain_rebuilds() -> None:
+    st = _SCHED
+    if st["running"]:
+        return
+    st["running"] = True
+    try:
+        while st["pending"] is not None and st["ready"]:
+            req = st["pending"]
+            st["pending"] = None
+            st["stats"]["runs"] += 1
+            area_keys = None if req["area"] is None else [k for k in VIEW_DEFS if k in req["area"]]
+            system_keys = None if req["system"] is None else [k for k in SYSTEM_DEFS if k in req["system"]]
+            rebuilt, skipped = await _rebuild_views(area_keys, system_keys, force=req["force"])
+            st["stats"]["rebuilt"] += rebuilt
+            st["stats"]["skipped"] += skipped
+            logger.info(f"[area-views] scheduler stats: {st['stats']}")
+    except Exception as e:
+        logger.error(f"[area-views] scheduled rebuild failed: {e}")
+    finally:
+        st["running"] = False
 
 
 @service
 async def build_system_views(view: str = None):
-    """Manual rebuild. Call with view='10_lighting' or empty to build all."""
+    """Manual rebuild (queued through the scheduler). Call with view='10_lighting' or empty to build all."""
     if view:
         sys_def = SYSTEM_DEFS.get(view)
         if not sys_def:
             logger.error(f"[system-views] unknown view '{view}'")
             return
-        await _write_system_view_file(view, sys_def["title"], sys_def)
+        await _request_rebuild(area_keys=[], system_keys=[view], force=True)
     else:
-        await _build_all_system_views()
+        await _request_rebuild(area_keys=[], force=True)
 
 
 # ----- triggers & service --------------------------------------------
@@ -1041,22 +1426,30 @@ async def build_system_views(view: str = None):
 
 @time_trigger("startup")
 async def build_all_on_change(**kwargs):
-    for key, val in VIEW_DEFS.items():
-        try:
-            await _write_view_file(key, val["title"], val["areas"])
-        except Exception as e:
-            logger.error(f"[area-views] failed writing {key}: {e}")
-    await _build_all_system_views()
+    await _request_rebuild(force=True)
+
+
+@event_trigger("area_registry_updated")
+@event_trigger("device_registry_updated")
+@event_trigger("entity_registry_updated")
+@event_trigger("floor_registry_updated")
+async def rebuild_on_registry_update(**kwargs):
+    """Incremental rebuild: only views whose areas/entities actually changed are rewritten.
+
+    Registry events arrive in bursts (integration reloads, bulk re-areaing); the
+    scheduler folds them into one build once they settle.
+    """
+    await _request_rebuild()
 
 
 @service
 async def build_area_views(view: str = None):
-    """Manual rebuild. Call with view='downstairs' or empty to build all."""
+    """Manual rebuild (queued through the scheduler). Call with view='downstairs' or empty to build all."""
     if view:
         val = VIEW_DEFS.get(view)
         if not val:
             logger.error(f"[area-views] unknown view '{view}'")
             return
-        await _write_view_file(view, val["title"], val["areas"])
+        await _request_rebuild(area_keys=[view], system_keys=[], force=True)
     else:
         await build_all_on_change()
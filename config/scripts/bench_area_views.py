@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+bench_area_views.py — time pyscript/build_area_views.py offline against a synthetic home
+
+- Loads the pyscript file with stand-ins for hass.states, the area/device/entity/floor
+  registries, task.* and the pyscript decorators (no Home Assistant needed)
+- Generates a synthetic home of configurable size (areas, floors, devices, entities)
+- Reports wall time, registry accesses and state lookups per builder phase
+- task.executor runs inline, so serialization and write time land in their own phase
+
+Example:
+  python3 bench_area_views.py --areas 50 --devices 5000 --entities 20000 --passes 2
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+DEFAULT_SCRIPT = Path(__file__).resolve().parent.parent / "pyscript" / "build_area_views.py"
+
+# (domain, device_class, unit, extra attributes) mix for synthetic entities
+ENTITY_KINDS = [
+    ("sensor", "temperature", "°C", {}),
+    ("sensor", "temperature", "°F", {}),
+    ("sensor", "humidity", "%", {}),
+    ("sensor", "power", "W", {}),
+    ("sensor", "volume_flow_rate", "ft³/h", {}),
+    ("sensor", "energy", "kWh", {"meter": "daily", "last_period": 0}),
+    ("sensor", "energy", "Wh", {"meter": "daily_total", "meter_period": "daily"}),
+    ("sensor", "gas", "m³", {"meter": "daily", "last_period": 0}),
+    ("sensor", "battery", "%", {}),
+    ("sensor", None, None, {}),
+    ("binary_sensor", "motion", None, {}),
+    ("binary_sensor", "door", None, {}),
+    ("binary_sensor", None, None, {}),
+    ("light", None, None, {}),
+    ("switch", "outlet", None, {}),
+    ("switch", None, None, {}),
+    ("fan", None, None, {}),
+    ("climate", None, None, {}),
+    ("humidifier", None, None, {}),
+    ("cover", None, None, {}),
+    ("lock", None, None, {}),
+    ("media_player", None, None, {}),
+    ("camera", None, None, {}),
+    ("automation", None, None, {}),
+    ("script", None, None, {}),
+    ("update", None, None, {}),
+]
+
+# ---------------- counters & fake Home Assistant ----------------
+
+COUNTS: Dict[str, int] = {"registry": 0, "states": 0}
+
+# Registries and states handed to the script; filled in once VIEW_DEFS is known
+HOME: Dict[str, Any] = {}
+
+# Last value/attributes the script published through state.set, by entity_id
+PUBLISHED: Dict[str, Dict[str, Any]] = {}
+
+# Services the script called through service.call, as "domain.name"
+SERVICE_CALLS: List[str] = []
+
+
+class Obj:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+class FakeAreaRegistry:
+    def __init__(self, areas):
+        self._areas = areas
+
+    def async_list_areas(self):
+        COUNTS["registry"] += 1
+        return list(self._areas)
+
+
+class FakeFloorRegistry:
+    def __init__(self, floors):
+        self._floors = floors
+
+    def async_list_floors(self):
+        COUNTS["registry"] += 1
+        return list(self._floors)
+
+
+class FakeDeviceRegistry:
+    def __init__(self, devices):
+        self._devices = devices
+
+    @property
+    def devices(self):
+        COUNTS["registry"] += 1
+        return self._devices
+
+
+class FakeEntityRegistry:
+    def __init__(self, entities):
+        self._entities = entities
+
+    @property
+    def entities(self):
+        COUNTS["registry"] += 1
+        return self._entities
+
+
+class FakeStates:
+    def __init__(self, states):
+        self._states = states
+
+    def get(self, entity_id):
+        COUNTS["states"] += 1
+        return self._states.get(entity_id)
+
+
+class HomeStates:
+    """hass.states proxy that resolves to whatever synthetic home is installed."""
+
+    def get(self, entity_id):
+        return HOME["states"].get(entity_id)
+
+
+def synthetic_home(view_defs: Dict[str, Dict], n_areas: int, n_floors: int, n_devices: int, n_entities: int, seed: int):
+    """Areas from VIEW_DEFS first (so every view has content), then area_NNN fillers."""
+    rng = random.Random(seed)
+
+    area_ids: List[str] = []
+    for view in view_defs.values():
+        for a in view["areas"]:
+            if a not in area_ids:
+                area_ids.append(a)
+    area_ids = area_ids[:n_areas]
+    area_ids += [f"area_{i:03d}" for i in range(len(area_ids), n_areas)]
+
+    floors = [Obj(floor_id=f"floor_{i}", name=f"Floor {i}") for i in range(n_floors)]
+    areas = [
+        Obj(id=aid, name=aid.replace("_", " ").title(), floor_id=(floors[i % n_floors].floor_id if floors else None))
+        for i, aid in enumerate(area_ids)
+    ]
+
+    devices = {}
+    for i in range(n_devices):
+        did = f"dev{i:06d}"
+        devices[did] = Obj(id=did, area_id=rng.choice(area_ids) if rng.random() > 0.05 else None)
+    device_ids = list(devices)
+
+    entities = {}
+    states = {}
+    for i in range(n_entities):
+        dom, dc, unit, extra = rng.choice(ENTITY_KINDS)
+        eid = f"{dom}.synthetic_{i:06d}"
+        dev = rng.choice(device_ids) if device_ids else None
+        # a few entities carry their own area (sometimes different from their device's)
+        own_area = rng.choice(area_ids) if rng.random() < 0.05 else None
+        disabled = "user" if rng.random() < 0.02 else None
+        entities[eid] = Obj(entity_id=eid, device_id=dev, area_id=own_area, disabled_by=disabled)
+
+        attrs: Dict[str, Any] = {"friendly_name": f"Synthetic {dom.replace('_', ' ')} {i}"}
+        if dc:
+            attrs["device_class"] = dc
+        if unit:
+            attrs["unit_of_measurement"] = unit
+        attrs.update(extra)
+        if rng.random() > 0.01:  # a few registry entries have no state yet
+            states[eid] = Obj(state="0", attributes=attrs)
+
+    return {
+        "area_registry": FakeAreaRegistry(areas),
+        "device_registry": FakeDeviceRegistry(devices),
+        "entity_registry": FakeEntityRegistry(entities),
+        "floor_registry": FakeFloorRegistry(floors),
+        "states": FakeStates(states),
+    }
+
+
+def install_fake_helpers() -> None:
+    """Register homeassistant.helpers.{area,device,entity,floor}_registry stand-ins backed by HOME."""
+    ha = types.ModuleType("homeassistant")
+    helpers = types.ModuleType("homeassistant.helpers")
+    ha.helpers = helpers
+    sys.modules["homeassistant"] = ha
+    sys.modules["homeassistant.helpers"] = helpers
+    for name in ("area_registry", "device_registry", "entity_registry", "floor_registry"):
+        mod = types.ModuleType(f"homeassistant.helpers.{name}")
+
+        async def async_get(hass, _name=name):
+            return HOME[_name]
+
+        mod.async_get = async_get
+        setattr(helpers, name, mod)
+        sys.modules[mod.__name__] = mod
+
+
+def fake_task():
+    async def executor(func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def create(func, *args, **kwargs):
+        return asyncio.ensure_future(func(*args, **kwargs))
+
+    async def wait(tasks, **kwargs):
+        return await asyncio.wait(tasks, **kwargs)
+
+    return Obj(executor=executor, create=create, wait=wait, sleep=asyncio.sleep, unique=lambda *a, **k: None)
+
+
+def fake_service():
+    """pyscript's `service`: the @service decorator, plus service.call (recorded, not run)."""
+
+    def service(func):
+        return func
+
+    service.call = lambda domain, name, **kwargs: SERVICE_CALLS.append(f"{domain}.{name}")
+    return service
+
+
+def fake_state_set(name, value=None, new_attributes=None, **kwargs):
+    PUBLISHED[name] = {"value": value, **(new_attributes or {}), **kwargs}
+
+
+def _decorator_factory(*args, **kwargs):
+    return lambda func: func
+
+
+def load_script(path: Path, out_dir: Path) -> Dict[str, Any]:
+    """Exec the pyscript file in a namespace that provides pyscript's builtins."""
+    install_fake_helpers()
+    ns: Dict[str, Any] = {
+        "__name__": "build_area_views",
+        "hass": Obj(states=HomeStates()),
+        "task": fake_task(),
+        "state": Obj(set=fake_state_set, get=lambda *a, **k: None),
+        "service": fake_service(),
+        "time_trigger": _decorator_factory,
+        "event_trigger": _decorator_factory,
+        "state_trigger": _decorator_factory,
+        "pyscript_compile": lambda func: func,
+    }
+    exec(compile(path.read_text(encoding="utf-8"), str(path), "exec"), ns)
+
+    # Redirect every output directory into out_dir
+    for key in list(ns):
+        if key.isupper() and key.endswith("_DIR") and isinstance(ns[key], str):
+            ns[key] = str(out_dir / ns[key].strip("/").replace("/", "_"))
+    return ns
+
+
+# ---------------- phase instrumentation ----------------
+
+# Builder functions timed as phases (inclusive of anything they call)
+PHASES = [
+    ("_registry_snapshot", "registry snapshot"),
+    ("_area_view_fingerprint", "area fingerprints"),
+    ("_system_context", "system context"),
+    ("_system_view_fingerprint", "system fingerprints"),
+    ("_cards_for_area", "area cards"),
+    ("_cards_for_system_groups", "system cards"),
+    ("_dump_view", "serialize + write"),
+]
+
+
+def instrument(ns: Dict[str, Any], stats: Dict[str, Dict[str, float]]) -> None:
+    """Wrap each phase function in ns so it accumulates into stats (cleared by the caller per pass)."""
+
+    def record(label: str, t0: float, c0: Dict[str, int]) -> None:
+        s = stats.setdefault(label, {"calls": 0, "secs": 0.0, "registry": 0, "states": 0})
+        s["calls"] += 1
+        s["secs"] += time.perf_counter() - t0
+        s["registry"] += COUNTS["registry"] - c0["registry"]
+        s["states"] += COUNTS["states"] - c0["states"]
+
+    def wrap(func: Callable, label: str) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            async def awrapper(*args, **kwargs):
+                t0, c0 = time.perf_counter(), dict(COUNTS)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record(label, t0, c0)
+
+            return awrapper
+
+        def wrapper(*args, **kwargs):
+            t0, c0 = time.perf_counter(), dict(COUNTS)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, t0, c0)
+
+        return wrapper
+
+    for name, label in PHASES:
+        if name in ns:
+            ns[name] = wrap(ns[name], label)
+
+
+def report(title: str, stats: Dict[str, Dict[str, float]], total: float, c0: Dict[str, int]) -> None:
+    print(f"\n== {title}: {total * 1000:.1f} ms, "
+          f"{COUNTS['registry'] - c0['registry']} registry accesses, {COUNTS['states'] - c0['states']} state lookups")
+    print(f"{'phase':<22}{'calls':>7}{'ms':>11}{'registry':>10}{'states':>10}")
+    for _, label in PHASES:
+        s = stats.get(label)
+        if s:
+            print(f"{label:<22}{s['calls']:>7}{s['secs'] * 1000:>11.1f}{s['registry']:>10}{s['states']:>10}")
+
+
+# ---------------- CLI ----------------
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark build_area_views.py offline with a synthetic home.")
+    ap.add_argument("--script", default=str(DEFAULT_SCRIPT), help="Path to build_area_views.py")
+    ap.add_argument("--areas", type=int, default=50, help="Number of areas (default 50)")
+    ap.add_argument("--floors", type=int, default=3, help="Number of floors (default 3)")
+    ap.add_argument("--devices", type=int, default=5000, help="Number of devices (default 5000)")
+    ap.add_argument("--entities", type=int, default=20000, help="Number of entities (default 20000)")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic home")
+    ap.add_argument("--passes", type=int, default=2, help="Build passes; pass 1 is forced, later ones incremental")
+    ap.add_argument("--out", help="Output directory for generated files (default: a temp dir)")
+    ap.add_argument("--verbose", action="store_true", help="Show the script's own log output")
+    args = ap.parse_args()
+
+    out_dir = Path(args.out or tempfile.mkdtemp(prefix="bench_area_views_"))
+    ns = load_script(Path(args.script), out_dir)
+    HOME.update(synthetic_home(ns["VIEW_DEFS"], args.areas, args.floors, args.devices, args.entities, args.seed))
+
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format="%(name)s - %(levelname)s - %(message)s")
+    else:
+        logging.disable(logging.INFO)
+
+    print(f"synthetic home: {args.areas} areas, {args.floors} floors, {args.devices} devices, "
+          f"{args.entities} entities -> {out_dir}")
+
+    stats: Dict[str, Dict[str, float]] = {}
+    instrument(ns, stats)
+    for i in range(args.passes):
+        stats.clear()
+        c0 = dict(COUNTS)
+        t0 = time.perf_counter()
+        asyncio.run(ns["_rebuild_views"](force=(i == 0)))
+        total = time.perf_counter() - t0
+        report(f"pass {i + 1} ({'forced' if i == 0 else 'incremental'})", stats, total, c0)
+        for name, attrs in PUBLISHED.items():
+            print(f"{name}: " + ", ".join(f"{k}={v}" for k, v in attrs.items() if k not in ("friendly_name", "icon")))
+        if SERVICE_CALLS:
+            print("service calls: " + ", ".join(SERVICE_CALLS))
+            SERVICE_CALLS.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+bench_templates.py — render custom_templates macros offline and time them
+
+- Builds a Jinja environment close to Home Assistant's (sandbox, loopcontrols, HA filters and
+  globals) over a synthetic set of states, like metrics/uv/test_exposure_st.py does by hand
+- Renders main.jinja getters for every device class in device_class/, the units/base.jinja
+  converters, the metrics/* calculators and the heavy macros/* (area_cards, health_charts,
+  pop_up_blinds)
+- Each case is compiled once, rendered once to warm up, then timed over --repeat renders
+- Reports ms/render and renders/sec per case, per-group totals and the slowest cases
+
+Example:
+  python3 bench_templates.py --repeat 20
+  python3 bench_templates.py --only main: --top 15 --json /tmp/bench.json
+"""
+
+import argparse
+import datetime
+import json
+import math
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import jinja2
+from jinja2.sandbox import ImmutableSandboxedEnvironment
+from jinja2.utils import Namespace
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / "custom_templates"
+
+# Fixed clock so time-dependent templates (UV, forecasts) do the same work on every run
+FIXED_NOW = datetime.datetime(2025, 6, 21, 11, 30, tzinfo=datetime.timezone.utc)
+
+# Getters template_card (dashboards/decluttering.yaml) renders per card
+CARD_GETTERS = ["get_icon", "get_color", "get_name", "get_label", "get_badge", "get_badge_color"]
+
+# ---------------- fake Home Assistant ----------------
+
+
+class FakeState:
+    """The slice of homeassistant.core.State the templates read."""
+
+    def __init__(self, entity_id: str, state: str, attributes: Optional[Dict[str, Any]] = None):
+        self.entity_id = entity_id
+        self.domain, self.object_id = entity_id.split(".", 1)
+        self.state = state
+        self.attributes = attributes or {}
+        self.name = self.attributes.get("friendly_name", self.object_id)
+
+
+class FakeStates:
+    """states(entity_id) and states.<domain> over a dict of FakeState."""
+
+    def __init__(self):
+        self._all: Dict[str, FakeState] = {}
+        self._areas: Dict[str, List[str]] = {}
+
+    def add(self, entity_id: str, state: Any, area: Optional[str] = None, **attributes) -> str:
+        self._all[entity_id] = FakeState(entity_id, str(state), attributes)
+        if area:
+            self._areas.setdefault(area, []).append(entity_id)
+        return entity_id
+
+    def get(self, entity_id: str) -> Optional[FakeState]:
+        return self._all.get(entity_id)
+
+    def area_entities(self, area: str) -> List[str]:
+        return list(self._areas.get(area, []))
+
+    def __call__(self, entity_id: str) -> str:
+        st = self._all.get(entity_id)
+        return st.state if st else "unknown"
+
+    def __getattr__(self, domain: str) -> List[FakeState]:
+        if domain.startswith("_"):
+            raise AttributeError(domain)
+        return sorted((s for s in self._all.values() if s.domain == domain), key=lambda s: s.entity_id)
+
+    def __iter__(self):
+        return iter(sorted(self._all.values(), key=lambda s: s.entity_id))
+
+
+class HAEnvironment(ImmutableSandboxedEnvironment):
+    """Home Assistant allows attribute access on namespace() objects inside the sandbox."""
+
+    def is_safe_attribute(self, obj, attr, value):
+        if isinstance(obj, Namespace):
+            return True
+        return super().is_safe_attribute(obj, attr, value)
+
+
+_SENTINEL = object()
+
+
+def _float(value, default=_SENTINEL):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        if default is _SENTINEL:
+            raise ValueError(f"float got invalid input '{value}'")
+        return default
+
+
+def _int(value, default=_SENTINEL, base=10):
+    result = jinja2.filters.do_int(value, default=default, base=base)
+    if result is _SENTINEL:
+        raise ValueError(f"int got invalid input '{value}'")
+    return result
+
+
+def _bool(value, default=_SENTINEL):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "on", "enable"):
+        return True
+    if text in ("0", "false", "no", "off", "disable"):
+        return False
+    if default is _SENTINEL:
+        raise ValueError(f"bool got invalid input '{value}'")
+    return default
+
+
+def _combine(*dicts, recursive=False):
+    out: Dict[str, Any] = {}
+    for d in dicts:
+        for k, v in d.items():
+            if recursive and isinstance(v, dict) and isinstance(out.get(k), dict):
+                out[k] = _combine(out[k], v, recursive=True)
+            else:
+                out[k] = v
+    return out
+
+
+def _as_datetime(value, default=_SENTINEL):
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+        dt = datetime.datetime.fromisoformat(str(value))
+        return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+        if default is _SENTINEL:
+            raise
+        return default
+
+
+def _as_local(value):
+    return value.astimezone(datetime.timezone.utc) if isinstance(value, datetime.datetime) else value
+
+
+def _as_timestamp(value, default=_SENTINEL):
+    dt = _as_datetime(value, None)
+    if dt is None:
+        if default is _SENTINEL:
+            raise ValueError(f"as_timestamp got invalid input '{value}'")
+        return default
+    return dt.timestamp()
+
+
+def _regex_flags(ignorecase):
+    return re.IGNORECASE if ignorecase else 0
+
+
+def make_env(root: Path, states: FakeStates) -> HAEnvironment:
+    env = HAEnvironment(loader=jinja2.FileSystemLoader(str(root)), extensions=["jinja2.ext.loopcontrols"])
+
+    def state_attr(entity_id, name):
+        st = states.get(entity_id)
+        return st.attributes.get(name) if st else None
+
+    def has_value(entity_id):
+        st = states.get(entity_id)
+        return bool(st) and st.state not in ("unknown", "unavailable")
+
+    env.filters.update(
+        {
+            "float": _float,
+            "int": _int,
+            "bool": _bool,
+            "combine": _combine,
+            "from_json": json.loads,
+            "tojson": lambda v: json.dumps(v, ensure_ascii=False),
+            "as_datetime": _as_datetime,
+            "as_local": _as_local,
+            "as_timestamp": _as_timestamp,
+            "timestamp_custom": lambda v, fmt="%Y-%m-%d %H:%M:%S", local=True, default=None: (
+                datetime.datetime.fromtimestamp(float(v), datetime.timezone.utc).strftime(fmt)
+            ),
+            "relative_time": lambda v: str(FIXED_NOW - v),
+            "log": lambda v, base=math.e: math.log(float(v), base),
+            "regex_match": lambda v, find="", ignorecase=False: bool(re.match(find, str(v), _regex_flags(ignorecase))),
+            "regex_search": lambda v, find="", ignorecase=False: bool(re.search(find, str(v), _regex_flags(ignorecase))),
+            "regex_replace": lambda v, find="", replace="", ignorecase=False: re.sub(
+                find, replace, str(v), flags=_regex_flags(ignorecase)
+            ),
+            "regex_findall": lambda v, find="", ignorecase=False: re.findall(find, str(v), _regex_flags(ignorecase)),
+        }
+    )
+    env.globals.update(
+        {
+            "states": states,
+            "state_attr": state_attr,
+            "is_state": lambda entity_id, value: states(entity_id) == value,
+            "has_value": has_value,
+            "state_translated": lambda entity_id: states(entity_id).replace("_", " ").capitalize(),
+            "area_entities": states.area_entities,
+            "area_name": lambda value: value,
+            "device_attr": lambda *args: None,
+            "now": lambda: FIXED_NOW,
+            "utcnow": lambda: FIXED_NOW,
+            "as_datetime": _as_datetime,
+            "as_local": _as_local,
+            "as_timestamp": _as_timestamp,
+            "timedelta": datetime.timedelta,
+            "float": _float,
+            "int": _int,
+            "bool": _bool,
+        }
+    )
+    return env
+
+
+# ---------------- synthetic states ----------------
+
+# Non-numeric states for device classes whose templates expect them
+SPECIAL_STATES = {
+    "date": lambda rnd: (FIXED_NOW.date() - datetime.timedelta(days=rnd.randint(0, 30))).isoformat(),
+    "timestamp": lambda rnd: (FIXED_NOW - datetime.timedelta(minutes=rnd.randint(1, 3000))).isoformat(),
+    "enum": lambda rnd: rnd.choice(["idle", "running", "paused"]),
+}
+
+AREA_KINDS = [
+    ("sensor", "temperature", "°C", {}),
+    ("sensor", "humidity", "%", {}),
+    ("sensor", "power", "W", {}),
+    ("sensor", "volume_flow_rate", "ft³/h", {}),
+    ("sensor", "energy", "kWh", {"meter": "daily"}),
+    ("sensor", "gas", "m³", {"meter": "daily"}),
+    ("binary_sensor", "motion", None, {}),
+    ("binary_sensor", "door", None, {}),
+    ("binary_sensor", "moisture", None, {}),
+    ("binary_sensor", "smoke", None, {}),
+    ("climate", None, None, {}),
+    ("light", None, None, {}),
+    ("switch", None, None, {}),
+    ("fan", None, None, {}),
+    ("cover", "blind", None, {"current_position": 40}),
+    ("cover", "shade", None, {}),
+    ("lock", None, None, {}),
+    ("media_player", None, None, {}),
+    ("automation", None, None, {}),
+]
+
+
+def device_class_entities(env: HAEnvironment, states: FakeStates, rnd: random.Random) -> List[Tuple[str, str, str]]:
+    """One entity per device-class template: (device_class, entity_id, app)."""
+    index = env.get_template("device_class/_index.jinja").module.DC_INDEX
+    out = []
+    for dc, info in index.items():
+        app = next(iter(info["levels"] or {"default": None}))
+        if dc == "binary":
+            eid = states.add("binary_sensor.bench_door", "on", friendly_name="Bench door", device_class="door")
+        else:
+            value = SPECIAL_STATES[dc](rnd) if dc in SPECIAL_STATES else round(rnd.uniform(0, 100), 1)
+            attrs = {"friendly_name": f"Bench {dc.replace('_', ' ')}"}
+            if dc != "none":
+                attrs["device_class"] = dc
+            if info["lookup_unit"]:
+                attrs["unit_of_measurement"] = info["lookup_unit"]
+            eid = states.add(f"sensor.bench_{dc}", value, **attrs)
+        out.append((dc, eid, app))
+    return out
+
+
+def populate_area(states: FakeStates, area: str, per_kind: int, rnd: random.Random) -> None:
+    for domain, dc, unit, extra in AREA_KINDS:
+        for i in range(per_kind):
+            slug = f"{area}_{dc or domain}_{i}" + ("_window" if domain == "cover" else "")
+            attrs = dict(extra, friendly_name=f"{area.title()} {dc or domain} {i}")
+            if dc:
+                attrs["device_class"] = dc
+            if unit:
+                attrs["unit_of_measurement"] = unit
+            if domain == "sensor":
+                state = round(rnd.uniform(0, 100), 1)
+            elif domain == "cover":
+                state = rnd.choice(["open", "closed", "closing"])
+                states.add(f"input_text.blind_{slug}_closed_reason", rnd.choice(["nighttime", "brightness", ""]))
+            else:
+                state = rnd.choice(["on", "off"])
+            states.add(f"{domain}.{slug}", state, area=area, **attrs)
+
+
+def populate_weather(states: FakeStates, rnd: random.Random, days: int = 7) -> None:
+    start = FIXED_NOW.replace(hour=0, minute=0)
+    hours = [start + datetime.timedelta(hours=h) for h in range(24 * days)]
+    uv = [round(max(0.0, 9 * math.sin(math.pi * (t.hour - 6) / 14)), 2) if 6 <= t.hour <= 20 else 0.0 for t in hours]
+    codes = [rnd.choice([0, 1, 2, 3, 61, 80, 95]) for _ in hours]
+    states.add(
+        "weather.bench",
+        "sunny",
+        friendly_name="Bench weather",
+        current={"time": FIXED_NOW.isoformat(), "weather_code": 1, "is_day": 1, "temperature_2m": 24.0},
+        hourly={
+            "time": [t.isoformat() for t in hours],
+            "uv_index": uv,
+            "weather_code": codes,
+            "is_day": [1 if 6 <= t.hour <= 20 else 0 for t in hours],
+            "temperature_2m": [round(rnd.uniform(15, 30), 1) for _ in hours],
+            "apparent_temperature": [round(rnd.uniform(15, 30), 1) for _ in hours],
+            "cloud_cover": [rnd.randint(0, 100) for _ in hours],
+            "dew_point_2m": [round(rnd.uniform(5, 18), 1) for _ in hours],
+            "relative_humidity_2m": [rnd.randint(30, 90) for _ in hours],
+            "precipitation_probability": [rnd.randint(0, 100) for _ in hours],
+            "precipitation": [round(rnd.uniform(0, 2), 1) for _ in hours],
+            "wind_speed_10m": [round(rnd.uniform(0, 30), 1) for _ in hours],
+            "wind_gusts_10m": [round(rnd.uniform(0, 50), 1) for _ in hours],
+            "wind_direction_10m": [rnd.randint(0, 359) for _ in hours],
+        },
+        daily={
+            "time": [(start + datetime.timedelta(days=d)).date().isoformat() for d in range(days)],
+            "weather_code": [rnd.choice([0, 2, 3, 61, 95]) for _ in range(days)],
+            "precipitation_probability_max": [rnd.randint(0, 100) for _ in range(days)],
+            "precipitation_sum": [round(rnd.uniform(0, 10), 1) for _ in range(days)],
+            "temperature_2m_max": [round(rnd.uniform(22, 32), 1) for _ in range(days)],
+            "temperature_2m_min": [round(rnd.uniform(10, 20), 1) for _ in range(days)],
+            "wind_direction_10m_dominant": [rnd.randint(0, 359) for _ in range(days)],
+            "wind_gusts_10m_max": [round(rnd.uniform(10, 60), 1) for _ in range(days)],
+            "wind_speed_10m_max": [round(rnd.uniform(5, 40), 1) for _ in range(days)],
+        },
+    )
+    states.add(
+        "sensor.bench_waqi",
+        "42",
+        friendly_name="Bench AQI",
+        dominentpol="pm25",
+        iaqi={"pm25": {"v": 42}, "pm10": {"v": 18}, "t": {"v": 24}},
+    )
+    plants = [
+        {
+            "code": code,
+            "displayName": code.title(),
+            "inSeason": True,
+            "indexInfo": {"value": rnd.randint(0, 5), "category": "Moderate", "color": {"red": 0.9, "green": 0.6}},
+        }
+        for code in ["oak", "birch", "grasses", "ragweed", "pine", "olive"]
+    ]
+    states.add(
+        "sensor.bench_pollen",
+        "2",
+        friendly_name="Bench pollen",
+        dailyInfo=[
+            {
+                "date": {"year": 2025, "month": 6, "day": 21 + d},
+                "plantInfo": plants,
+                "pollenTypeInfo": [
+                    {"code": t, "displayName": t.title(), "indexInfo": {"value": rnd.randint(0, 5), "category": "Low"}}
+                    for t in ["tree", "grass", "weed"]
+                ],
+            }
+            for d in range(5)
+        ],
+    )
+    states.add("sensor.date", FIXED_NOW.date().isoformat())
+
+
+# ---------------- cases ----------------
+
+Case = Tuple[str, str, str, Dict[str, Any]]  # (group, name, template source, render variables)
+
+
+def main_cases(dc_entities: List[Tuple[str, str, str]]) -> List[Case]:
+    card = "".join(
+        f"{{% from 'main.jinja' import {g} %}}{{{{ {g}(entity, app, options) }}}}\n" for g in CARD_GETTERS
+    )
+    info = "{% from 'main.jinja' import get_device_state_info %}{{ get_device_state_info(entity, app, options) }}"
+    chip = "{% from 'main.jinja' import get_fields %}{{ get_fields(entity, app, ['name', 'short_desc'], ': ') }}"
+    cases: List[Case] = []
+    for dc, eid, app in dc_entities:
+        ctx = {"entity": eid, "app": app, "options": "layout=vertical; vert_delim= • "}
+        cases.append(("main", f"{dc}:card", card, ctx))
+        cases.append(("main", f"{dc}:info", info, ctx))
+        cases.append(("main", f"{dc}:chip", chip, ctx))
+    return cases
+
+
+def units_cases() -> List[Case]:
+    imp = "{% import 'units/base.jinja' as U %}"
+    calls = {
+        "u_convert": "U.u_convert(21.5, '°C', '°F')",
+        "u_convert_value": "U.u_convert_value(1500, 'W', 'kW')",
+        "u_convert_rate": "U.u_convert_value(3.2, 'ft³/h', 'L/min')",
+        "u_convert_entity": "U.u_convert_entity('sensor.bench_energy', 'Wh')",
+        "u_humanize_value": "U.u_humanize_value(123456789, 'B')",
+        "u_humanize_duration": "U.u_humanize_duration(5400, 's')",
+        "u_humanize_entity": "U.u_humanize_entity('sensor.bench_power')",
+        "u_convert_humanize_value": "U.u_convert_humanize_value(2500, 'W', 'kW')",
+        "sig_format": "U.sig_format(0.000123456)",
+    }
+    return [("units", name, imp + "{{ " + call + " }}", {}) for name, call in calls.items()]
+
+
+def metrics_cases() -> List[Case]:
+    specs = [
+        ("aqi.compute_aqi", "metrics/air_quality/aqi_calc.jinja", "compute_aqi(pm25=35.2, pm10=80)"),
+        ("aqi.iaqi", "metrics/air_quality/helpers.jinja", "iaqi('sensor.bench_waqi', 'pm25')"),
+        ("aqi.dominant", "metrics/air_quality/pollutants.jinja", "dominant('sensor.bench_waqi')"),
+        # hi() converts units through convert_temp, which no template defines, so time the °F core;
+        # wind_chill.jinja does not render yet (wc_f reads an undefined `regex`)
+        ("temperature.hi_f", "metrics/temperature/heat_index.jinja", "hi_f(91, 65)"),
+        ("utilities.area_energy", "metrics/utilities/electric_helpers.jinja", "area_energy('kitchen')"),
+        ("utilities.m3_to_therms", "metrics/utilities/gas_helpers.jinja", "m3_to_therms(12.5)"),
+        ("uv.exposure_st", "metrics/uv/exposure_st.jinja", "uv_safe_exposure_multi('weather.bench')"),
+        ("uv.uv_window", "metrics/uv/protection_window.jinja", "uv_window('weather.bench', 3)"),
+        ("uv.vitd_label", "metrics/uv/vitamin_d.jinja", "vitd_label(6, 3)"),
+        ("weather.current", "metrics/weather/forecasts.jinja", "current_condition('weather.bench')"),
+        ("weather.daily", "metrics/weather/forecasts.jinja", "forecast_daily('weather.bench')"),
+        ("weather.hourly", "metrics/weather/forecasts.jinja", "forecast_hourly('weather.bench', 24)"),
+        ("pollen.build_ctx", "metrics/pollen/pollen.jinja", "build_ctx('sensor.bench_pollen')"),
+    ]
+    return [("metrics", name, f"{{% import '{path}' as M %}}{{{{ M.{call} }}}}", {}) for name, path, call in specs]
+
+
+def macro_cases(area: str) -> List[Case]:
+    specs = [
+        ("area_cards", "macros/area_cards.jinja", f"area_cards('{area}')"),
+        ("health_charts.bp_chart", "macros/health_charts.jinja", "generate_bp_chart()"),
+        ("pop_up_blinds.build_blind_cards", "macros/pop_up_blinds.jinja", "build_blind_cards()"),
+        ("pop_up_blinds.count_closed", "macros/pop_up_blinds.jinja", "count_blinds_closed()"),
+        ("pop_up_blinds.in_area", "macros/pop_up_blinds.jinja", f"build_blind_cards_in_area('{area}')"),
+    ]
+    return [("macros", name, f"{{% import '{path}' as M %}}{{{{ M.{call} }}}}", {}) for name, path, call in specs]
+
+
+# ---------------- timing & report ----------------
+
+
+def run_case(env: HAEnvironment, case: Case, repeat: int) -> Dict[str, Any]:
+    group, name, source, ctx = case
+    result: Dict[str, Any] = {"group": group, "name": name}
+    try:
+        template = env.from_string(source)
+        out = template.render(**ctx)  # warm-up: imported modules get compiled and cached here
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            template.render(**ctx)
+        elapsed = time.perf_counter() - t0
+    except Exception as exc:  # keep benchmarking the other cases
+        result["error"] = f"{type(exc).__name__}: {exc}"
+        return result
+    result.update(ms=elapsed * 1000 / repeat, rps=repeat / elapsed if elapsed else float("inf"), bytes=len(out))
+    return result
+
+
+def report(results: List[Dict[str, Any]], top: int) -> None:
+    ok = [r for r in results if "error" not in r]
+    for group in dict.fromkeys(r["group"] for r in results):
+        rows = [r for r in results if r["group"] == group]
+        timed = [r for r in rows if "error" not in r]
+        total = sum(r["ms"] for r in timed)
+        print(f"\n=== {group}: {len(timed)} cases, {total:.1f} ms for one render of each ===")
+        print(f"  {'case':<40} {'ms/render':>10} {'renders/s':>10} {'bytes':>8}")
+        for r in sorted(rows, key=lambda r: -r.get("ms", -1)):
+            if "error" in r:
+                print(f"  {r['name']:<40} ERROR {r['error']}")
+            else:
+                print(f"  {r['name']:<40} {r['ms']:>10.3f} {r['rps']:>10.0f} {r['bytes']:>8}")
+
+    if top and ok:
+        print(f"\n=== slowest {min(top, len(ok))} ===")
+        for r in sorted(ok, key=lambda r: -r["ms"])[:top]:
+            print(f"  {r['group'] + ':' + r['name']:<48} {r['ms']:>10.3f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark custom_templates macros offline with synthetic states.")
+    ap.add_argument("--root", default=str(DEFAULT_ROOT), help="custom_templates directory")
+    ap.add_argument("--repeat", type=int, default=10, help="Timed renders per case (default 10)")
+    ap.add_argument("--per-kind", type=int, default=3, help="Entities per kind in the benchmark area (default 3)")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic states")
+    ap.add_argument("--only", action="append", help="Only run cases whose 'group:name' contains this. Repeatable.")
+    ap.add_argument("--top", type=int, default=10, help="Show the N slowest cases overall (default 10)")
+    ap.add_argument("--json", help="Also write the results to this JSON file")
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    states = FakeStates()
+    env = make_env(Path(args.root).resolve(), states)
+    dc_entities = device_class_entities(env, states, rnd)
+    populate_area(states, "kitchen", args.per_kind, rnd)
+    populate_weather(states, rnd)
+
+    cases = main_cases(dc_entities) + units_cases() + metrics_cases() + macro_cases("kitchen")
+    if args.only:
+        cases = [c for c in cases if any(f in f"{c[0]}:{c[1]}" for f in args.only)]
+
+    t0 = time.perf_counter()
+    results = [run_case(env, case, args.repeat) for case in cases]
+    print(f"{len(cases)} cases x {args.repeat} renders in {time.perf_counter() - t0:.2f}s")
+    report(results, args.top)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n[OK] wrote {args.json}")
+
+    sys.exit(1 if any("error" in r for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
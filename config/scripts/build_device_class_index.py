@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+build_device_class_index.py — precompile custom_templates/device_class/*.jinja into one dispatch table
+
+- Evaluates each device-class template once and captures its `lookup_unit` and `levels`
+- Records which presentation getters (get_icon, get_label, ...) the template overrides
+- Writes device_class/_index.jinja defining DC_INDEX = {class: {lookup_unit, overrides, levels}}
+
+main.jinja resolves a device class with one DC_INDEX lookup and only imports the
+device-class template itself when it overrides a getter.
+
+Re-run after editing any device_class/*.jinja:
+  python3 build_device_class_index.py            # (re)write the index
+  python3 build_device_class_index.py --check    # exit 1 if the index is stale
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader
+from jinja2.runtime import Macro
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / "custom_templates"
+INDEX_NAME = "_index.jinja"
+
+# Getters main.jinja lets a device-class template override
+OVERRIDABLE = [
+    "get_value",
+    "get_name",
+    "get_default_desc",
+    "get_short_desc",
+    "get_long_desc",
+    "get_full_desc",
+    "get_icon",
+    "get_color",
+    "get_badge",
+    "get_badge_color",
+    "get_label",
+    "get_short_label",
+    "get_long_label",
+]
+
+
+def _combine(*dicts, recursive=False):
+    out = {}
+    for d in dicts:
+        for k, v in d.items():
+            if recursive and isinstance(v, dict) and isinstance(out.get(k), dict):
+                out[k] = _combine(out[k], v, recursive=True)
+            else:
+                out[k] = v
+    return out
+
+
+# Home Assistant filters that only appear inside macros; they must exist to compile, never run here
+HA_MACRO_FILTERS = [
+    "bool",
+    "regex_match",
+    "regex_replace",
+    "regex_findall",
+    "as_datetime",
+    "as_local",
+    "as_timestamp",
+    "timestamp_custom",
+    "relative_time",
+    "log",
+]
+
+
+def _not_evaluated(*args, **kwargs):
+    raise RuntimeError("Home Assistant filter used at template top level; cannot precompile")
+
+
+def make_env(root: Path) -> Environment:
+    """Just enough of Home Assistant's template environment to evaluate template top levels."""
+    env = Environment(loader=FileSystemLoader(str(root)), extensions=["jinja2.ext.loopcontrols"])
+    for name in HA_MACRO_FILTERS:
+        env.filters[name] = _not_evaluated
+    env.filters["combine"] = _combine
+    env.filters["from_json"] = json.loads
+    env.filters["tojson"] = lambda v: json.dumps(v, ensure_ascii=False)
+    return env
+
+
+def jinja_literal(value, indent: int = 0) -> str:
+    """Render plain data as a Jinja literal (none/true/false rather than JSON's null/true/false)."""
+    pad = "    " * indent
+    if value is None:
+        return "none"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return "[]"
+        if all(not isinstance(v, (dict, list, tuple)) for v in value):
+            return "[" + ", ".join(jinja_literal(v) for v in value) + "]"
+        inner = ",\n".join(pad + "    " + jinja_literal(v, indent + 1) for v in value)
+        return "[\n" + inner + ",\n" + pad + "]"
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        # level rows (flat dicts) stay on one line
+        if all(not isinstance(v, (dict, list, tuple)) for v in value.values()):
+            return "{" + ", ".join(f"{json.dumps(str(k))}: {jinja_literal(v)}" for k, v in value.items()) + "}"
+        inner = ",\n".join(
+            f"{pad}    {json.dumps(str(k))}: {jinja_literal(v, indent + 1)}" for k, v in value.items()
+        )
+        return "{\n" + inner + ",\n" + pad + "}"
+    raise TypeError(f"unsupported value in device-class data: {value!r}")
+
+
+def build_index(root: Path) -> str:
+    env = make_env(root)
+    entries = {}
+    for path in sorted((root / "device_class").glob("*.jinja")):
+        if path.name.startswith("_"):
+            continue
+        module = env.get_template(f"device_class/{path.name}").module
+        overrides = [name for name in OVERRIDABLE if isinstance(getattr(module, name, None), Macro)]
+        entries[path.stem] = {
+            "lookup_unit": getattr(module, "lookup_unit", None),
+            "overrides": overrides,
+            "levels": getattr(module, "levels", None),
+        }
+
+    return (
+        "{#- GENERATED by scripts/build_device_class_index.py from device_class/*.jinja; do not edit.\n"
+        "    DC_INDEX[device_class] = {lookup_unit, overrides (getter macros the class template\n"
+        "    defines), levels}. Re-run the script after changing any device-class template. -#}\n"
+        "\n"
+        "{# djlint:off #}\n"
+        f"{{% set DC_INDEX = {jinja_literal(entries)} %}}\n"
+        "{# djlint:on #}\n"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompile device_class/*.jinja into device_class/_index.jinja.")
+    ap.add_argument("--root", default=str(DEFAULT_ROOT), help="custom_templates directory")
+    ap.add_argument("--check", action="store_true", help="Exit 1 if the index is missing or out of date")
+    args = ap.parse_args()
+
+    root = Path(args.root).resolve()
+    out_path = root / "device_class" / INDEX_NAME
+    text = build_index(root)
+    current = out_path.read_text(encoding="utf-8") if out_path.exists() else None
+
+    if args.check:
+        if current != text:
+            print(f"[STALE] {out_path}")
+            sys.exit(1)
+        print(f"[OK] {out_path}")
+        return
+
+    if current == text:
+        print(f"[OK] {out_path}")
+    else:
+        out_path.write_text(text, encoding="utf-8")
+        print(f"[UPDATED] {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 #!/usr/bin/env python3
 import argparse
-import copy
 import glob
 import os
 import re
 import sys
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import yaml
 
 # ---------------- YAML loader with root-aware !include ----------------
 
+# libyaml's C parser when PyYAML was built with it, the pure-Python loader otherwise
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-class LoaderWithIncludes(yaml.SafeLoader):
+
+class LoaderWithIncludes(SafeLoader):
     def __init__(self, stream, current_dir: Optional[str] = None, root: Optional[str] = None):
         super().__init__(stream)
         if hasattr(stream, "name"):
@@ -42,10 +44,29 @@ def load_yaml(path: str, root: Optional[str] = None):
             loader.dispose()
 
 
+# Parsed includes for this run: (path, root) -> (mtime_ns, size, document).
+# A file included from many places (decluttering.yaml, shared card fragments) is parsed once;
+# every include site gets the same document, so it must be treated as read-only — the expansion
+# below only ever builds new dicts/lists from its input.
+_INCLUDE_CACHE: Dict[Tuple[str, str], Tuple[int, int, Any]] = {}
+
+
+def load_include(path: str, root: Optional[str] = None):
+    path = os.path.abspath(path)
+    key = (path, os.path.abspath(root) if root else "")
+    st = os.stat(path)
+    hit = _INCLUDE_CACHE.get(key)
+    if hit is not None and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+    data = load_yaml(path, root=root)
+    _INCLUDE_CACHE[key] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+
 def _construct_include(loader: LoaderWithIncludes, node: yaml.Node):
     rel = loader.construct_scalar(node)
     file_path = _resolve_path(loader, rel)
-    return load_yaml(file_path, root=loader._root)
+    return load_include(file_path, root=loader._root)
 
 
 def _construct_include_dir_merge_named(loader: LoaderWithIncludes, node: yaml.Node):
@@ -53,7 +74,7 @@ def _construct_include_dir_merge_named(loader: LoaderWithIncludes, node: yaml.No
     dir_path = _resolve_path(loader, rel)
     out: Dict[str, Any] = {}
     for path in sorted(glob.glob(os.path.join(dir_path, "*.yaml")) + glob.glob(os.path.join(dir_path, "*.yml"))):
-        data = load_yaml(path, root=loader._root)
+        data = load_include(path, root=loader._root)
         if isinstance(data, dict):
             out.update(data)
     return out
@@ -64,7 +85,7 @@ def _construct_include_dir_list(loader: LoaderWithIncludes, node: yaml.Node):
     dir_path = _resolve_path(loader, rel)
     out: List[Any] = []
     for path in sorted(glob.glob(os.path.join(dir_path, "*.yaml")) + glob.glob(os.path.join(dir_path, "*.yml"))):
-        data = load_yaml(path, root=loader._root)
+        data = load_include(path, root=loader._root)
         if isinstance(data, list):
             out.extend(data)
         elif data is not None:
@@ -99,25 +120,6 @@ def normalize_variables(vars_in: Union[None, Dict[str, Any], List[Dict[str, Any]
     return out
 
 
-def substitute_declutter_in_str(s: str, vars_map: Dict[str, Any]) -> str:
-    def _rep(m: re.Match) -> str:
-        key = m.group(1)
-        return str(vars_map.get(key, m.group(0)))
-
-    return RE_DBLBRACK.sub(_rep, s)
-
-
-def deep_substitute_declutter(obj: Any, vars_map: Dict[str, Any]) -> Any:
-    if isinstance(obj, dict):
-        return {k: deep_substitute_declutter(v, vars_map) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [deep_substitute_declutter(x, vars_map) for x in obj]
-    if isinstance(obj, str):
-        # leave {{ ... }} / {% ... %} / {# ... #} untouched
-        return substitute_declutter_in_str(obj, vars_map)
-    return obj
-
-
 def collect_decluttering_templates(obj: Any) -> Dict[str, Any]:
     found: Dict[str, Any] = {}
 
@@ -138,42 +140,149 @@ def collect_decluttering_templates(obj: Any) -> Dict[str, Any]:
 
 
 def deep_merge(a: Any, b: Any) -> Any:
+    # Copy-on-write: only the dicts/lists along merged paths are new; every other subtree of
+    # a and b is shared with the result (nothing here mutates its input after loading).
     if isinstance(a, dict) and isinstance(b, dict):
+        if not a or not b:
+            return b if not a else a
         out = dict(a)
         for k, v in b.items():
-            out[k] = deep_merge(out[k], v) if k in out else copy.deepcopy(v)
+            out[k] = deep_merge(out[k], v) if k in out else v
         return out
     if isinstance(a, list) and isinstance(b, list):
-        return a + copy.deepcopy(b)
-    return copy.deepcopy(b)
+        return a + b if a and b else (a or b)
+    return b
+
+
+# A substitution plan mirrors a template body, compiled once per template:
+#   ("const", obj)          subtree without placeholders, shared as-is (never mutated)
+#   ("dict", [(k, plan)])   / ("list", [plan])
+#   ("var", name, text)     a bare '[[var]]': the variable's value as-is, else text unchanged
+#   ("str", [seg])          placeholders inside a string; seg is a literal or (name, text)
+def compile_template(obj: Any) -> Tuple:
+    if isinstance(obj, dict):
+        items = [(k, compile_template(v)) for k, v in obj.items()]
+        if all(p[0] == "const" for _, p in items):
+            return ("const", obj)
+        return ("dict", items)
+    if isinstance(obj, list):
+        plans = [compile_template(x) for x in obj]
+        if all(p[0] == "const" for p in plans):
+            return ("const", obj)
+        return ("list", plans)
+    if isinstance(obj, str) and "[[" in obj:
+        m = RE_DBLBRACK.fullmatch(obj)
+        if m:
+            return ("var", m.group(1), obj)
+        segs: List[Any] = []
+        pos = 0
+        for m in RE_DBLBRACK.finditer(obj):
+            if m.start() > pos:
+                segs.append(obj[pos : m.start()])
+            segs.append((m.group(1), m.group(0)))
+            pos = m.end()
+        if segs:
+            if pos < len(obj):
+                segs.append(obj[pos:])
+            return ("str", segs)
+    return ("const", obj)
+
+
+def instantiate(plan: Tuple, vars_map: Dict[str, Any]) -> Any:
+    kind = plan[0]
+    if kind == "const":
+        return plan[1]
+    if kind == "dict":
+        return {k: instantiate(p, vars_map) for k, p in plan[1]}
+    if kind == "list":
+        return [instantiate(p, vars_map) for p in plan[1]]
+    if kind == "var":
+        return vars_map[plan[1]] if plan[1] in vars_map else plan[2]
+    # leave {{ ... }} / {% ... %} / {# ... #} untouched
+    return "".join(
+        seg if isinstance(seg, str) else str(vars_map.get(seg[0], seg[1])) for seg in plan[1]
+    )
 
 
 def apply_template_single(template_body: Any, vars_map: Dict[str, Any]) -> Any:
-    tpl = copy.deepcopy(template_body)
-    return deep_substitute_declutter(tpl, vars_map)
+    return instantiate(compile_template(template_body), vars_map)
+
+
+def _freeze(obj: Any, shared: Dict[int, Any]) -> Any:
+    """Hashable, type-exact key for plain YAML data (True, 1 and 1.0 stay distinct; key order counts).
+    Subtrees listed in shared (id -> key) are already-expanded cards and stand in as their key."""
+    if id(obj) in shared:
+        return shared[id(obj)]
+    if isinstance(obj, dict):
+        return (dict, tuple((k, _freeze(v, shared)) for k, v in obj.items()))
+    if isinstance(obj, list):
+        return (list, tuple(_freeze(x, shared) for x in obj))
+    if isinstance(obj, set):
+        return (set, frozenset(obj))
+    return (type(obj), obj)
+
 
+class _Memo:
+    """Expanded decluttering cards for one run, keyed by the frozen card (template, variables, overrides)."""
 
-def expand_decluttering_nodes(node: Any, templates: Dict[str, Any]) -> Any:
+    def __init__(self):
+        self.cards: Dict[Any, Any] = {}
+        # substitution plan of each template body, by template name
+        self.plans: Dict[str, Tuple] = {}
+        # id of each expanded card -> a small key standing in for it when an enclosing card is frozen
+        self.shared: Dict[int, Any] = {}
+
+    def get(self, key: Any) -> Any:
+        return self.cards.get(key)
+
+    def put(self, key: Any, card: Any) -> Any:
+        self.cards[key] = card
+        self.shared.setdefault(id(card), ("card", len(self.shared)))
+        return card
+
+
+def expand_decluttering_nodes(node: Any, templates: Dict[str, Any], memo: Optional[_Memo] = None) -> Any:
+    # Identical decluttering cards (same templates, variables and overrides) are expanded — including
+    # their nested templates — once per run, and every instance shares the expanded tree; like the
+    # parsed includes it is never mutated afterwards.
+    if memo is None:
+        memo = _Memo()
     if isinstance(node, list):
-        return [expand_decluttering_nodes(n, templates) for n in node]
+        out = [expand_decluttering_nodes(n, templates, memo) for n in node]
+        # nothing expanded below: keep sharing the input list
+        return node if all(x is y for x, y in zip(out, node)) else out
     if isinstance(node, dict):
-        node = {k: expand_decluttering_nodes(v, templates) for k, v in node.items()}
+        out = {k: expand_decluttering_nodes(v, templates, memo) for k, v in node.items()}
+        if any(out[k] is not v for k, v in node.items()):
+            node = out
         if node.get("type") == "custom:decluttering-card":
             tpl_spec = node.get("template")
-            vars_map = normalize_variables(node.get("variables"))
             if tpl_spec is None:
                 return node
+            key = _freeze(node, memo.shared)
+            hit = memo.get(key)
+            if hit is not None:
+                return hit
+            vars_map = normalize_variables(node.get("variables"))
             names = tpl_spec if isinstance(tpl_spec, list) else [tpl_spec]
             result: Any = {}
             for name in names:
                 if name not in templates:
                     raise KeyError(f"Decluttering template '{name}' not found")
                 body = templates[name]
-                expanded = apply_template_single(body, vars_map)
+                tpl_vars = vars_map
+                # decluttering-card templates: {default: [...], card: {...}} (or element: for badges)
+                if isinstance(body, dict) and ("card" in body or "element" in body):
+                    tpl_vars = normalize_variables(body.get("default"))
+                    tpl_vars.update(vars_map)
+                    body = body["card"] if "card" in body else body["element"]
+                if name not in memo.plans:
+                    memo.plans[name] = compile_template(body)
+                expanded = instantiate(memo.plans[name], tpl_vars)
                 result = deep_merge(result, expanded)
             overrides = {k: v for k, v in node.items() if k not in ("type", "template", "variables")}
             result = deep_merge(result, overrides)
-            return expand_decluttering_nodes(result, templates)
+            return memo.put(key, expand_decluttering_nodes(result, templates, memo))
         return node
     return node
 
@@ -189,6 +298,8 @@ def strip_keys(obj: Any, keys: List[str]) -> Any:
 # ---------------- YAML dump that preserves Jinja literally ----------------
 
 
+# Stays on the pure-Python emitter: libyaml's emitter escapes emoji as \U... and refolds quoted
+# scalars, and the expanded dashboards are meant to be read.
 class LiteralDumper(yaml.SafeDumper):
     pass
 
@@ -210,6 +321,9 @@ LiteralDumper.add_representer(str, lambda dumper, data: _repr_str_preserve(data)
 # Avoid line-wrapping which could reflow Jinja
 LiteralDumper.width = 10**9  # effectively no wrap
 
+# Included documents are shared between include sites; always write them out in full, never as &anchors
+LiteralDumper.ignore_aliases = lambda self, data: True
+
 # ---------------- CLI ----------------
 
 